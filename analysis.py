@@ -0,0 +1,241 @@
+import asyncio
+import sys
+import threading
+
+from engine import Engine
+from snapshot import PROMOTIONS, Snapshot, move_to_str, parse_move
+
+
+class AnalysisSession:
+    """Потоковый анализ позиции с возможностью остановки.
+
+    Итеративное углубление идёт в рабочем потоке, а результаты каждой
+    завершённой глубины приходят в asyncio как асинхронный итератор.
+    Остановка проверяется в каждом узле перебора, так что задержка
+    отмены ограничена временем обработки одного узла. Пока поиск
+    идёт, ``best`` - последний завершённый результат.
+
+        session = AnalysisSession(Engine())
+        session.start(position, time_limit=5)
+        async for info in session:
+            print(info)
+        result = await session.wait()
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine or Engine(max_depth=64, time_limit=0)
+        self.best = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._queue = None
+        self._done = None
+
+    @property
+    def running(self):
+        return self._done is not None and not self._done.done()
+
+    def start(self, position, max_depth=None, time_limit=0):
+        """Запускает анализ; вызывать из работающего цикла asyncio"""
+        if self.running:
+            raise RuntimeError("Анализ уже идёт: сначала stop() или restart()")
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = loop.create_future()
+        stop = threading.Event()
+        self.best = None
+        self._queue, self._done, self._stop = queue, done, stop
+
+        def publish(result):
+            self.best = result
+            loop.call_soon_threadsafe(queue.put_nowait, result)
+
+        def run():
+            try:
+                result = self.engine.search(position, max_depth, time_limit, stop, publish)
+            except BaseException as exc:  # Ошибку поиска получит тот, кто ждёт
+                loop.call_soon_threadsafe(_finish, done, queue, None, exc)
+            else:
+                loop.call_soon_threadsafe(_finish, done, queue, result, None)
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Просит поиск остановиться; итог придёт в wait()"""
+        self._stop.set()
+
+    async def wait(self):
+        """Ждёт окончания поиска и возвращает лучший завершённый результат"""
+        return await self._done
+
+    async def restart(self, position, max_depth=None, time_limit=0):
+        """Прерывает текущий анализ и начинает анализ новой позиции"""
+        if self.running:
+            self.stop()
+            await self._done
+        self.start(position, max_depth, time_limit)
+
+    def __aiter__(self):
+        return self._updates()
+
+    async def _updates(self):
+        queue = self._queue
+        while True:
+            result = await queue.get()
+            if result is None:
+                return
+            yield result
+
+
+def _finish(done, queue, result, exc):
+    if not done.done():
+        if exc is not None:
+            done.set_exception(exc)
+        else:
+            done.set_result(result)
+    queue.put_nowait(None)
+
+
+def _uci_move(move):
+    """Ход в записи UCI: 'e2e4', 'e7e8q'"""
+    return move_to_str(move).replace(' ', '')
+
+
+def _parse_uci_move(position, text):
+    """Разбирает ход UCI и проверяет его по position.moves(); ValueError, если хода нет"""
+    squares = text[:2], text[2:4]
+    if (len(text) not in (4, 5) or
+            any(square[0] not in 'abcdefgh' or square[1] not in '12345678' for square in squares) or
+            text[4:] not in ('',) + PROMOTIONS):
+        raise ValueError(f"bad move {text}")
+    move = parse_move(f"{squares[0]} {squares[1]} {text[4:]}")
+    legal = position.moves()
+    if move not in legal:
+        # Без буквы превращения пешка становится ферзём, как в Snapshot.play
+        move += ('q',)
+        if move not in legal:
+            raise ValueError(f"illegal move {text}")
+    return move
+
+
+def _go_option(tokens, name):
+    """Положительное целое значение параметра go (depth, movetime) или None.
+
+    Ноль не принимается: у Engine.search он означает перебор без предела.
+    """
+    if name not in tokens:
+        return None
+    index = tokens.index(name) + 1
+    if index >= len(tokens) or not tokens[index].isdigit() or int(tokens[index]) < 1:
+        raise ValueError(f"{name} needs a positive integer")
+    return int(tokens[index])
+
+
+def _info_line(result):
+    pv = ' '.join(_uci_move(move) for move in result.pv)
+    return (f"info depth {result.depth} score cp {result.score} nodes {result.nodes} "
+            f"time {int(result.elapsed * 1000)} pv {pv}").rstrip()
+
+
+class UCIAdapter:
+    """Простой UCI-подобный протокол поверх AnalysisSession.
+
+    Поддерживаются команды uci, isready, ucinewgame,
+    position startpos [moves ...], go [depth N] [movetime MS] [infinite],
+    stop и quit. Ходы записываются как в UCI: e2e4, e7e8q.
+    """
+
+    def __init__(self, game='qwe', engine=None, stdin=None, stdout=None):
+        self.game = game
+        self.session = AnalysisSession(engine)
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+        self.position = Snapshot.initial(game)
+        self._reporter = None
+        self._bounded = False
+
+    def send(self, line):
+        self.stdout.write(line + '\n')
+        self.stdout.flush()
+
+    async def _report(self):
+        """Передаёт промежуточные результаты и итоговый ход"""
+        async for result in self.session:
+            self.send(_info_line(result))
+        result = await self.session.wait()
+        self.send(f"bestmove {_uci_move(result.move) if result.move else '0000'}")
+
+    async def _stop_search(self):
+        if self._reporter is not None:
+            self.session.stop()
+            await self._reporter
+            self._reporter = None
+
+    async def handle(self, line):
+        """Обрабатывает одну команду; возвращает False на quit.
+
+        На ошибку во вводе отвечает 'info string ...' и продолжает работу.
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        try:
+            return await self._dispatch(tokens)
+        except ValueError as exc:
+            self.send(f"info string error: {exc}")
+            return True
+
+    async def _dispatch(self, tokens):
+        command = tokens[0]
+        if command == 'uci':
+            self.send(f"id name ChessCheckers {self.game}")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'ucinewgame':
+            await self._stop_search()
+            self.position = Snapshot.initial(self.game)
+        elif command == 'position':
+            if len(tokens) < 2 or tokens[1] != 'startpos':
+                raise ValueError("only 'position startpos [moves ...]' is supported")
+            position = Snapshot.initial(self.game)
+            if 'moves' in tokens:
+                for move in tokens[tokens.index('moves') + 1:]:
+                    position = position.play(_parse_uci_move(position, move))
+            await self._stop_search()
+            self.position = position
+        elif command == 'go':
+            max_depth = _go_option(tokens, 'depth')
+            movetime = _go_option(tokens, 'movetime')
+            time_limit = movetime / 1000 if movetime else 0
+            await self._stop_search()
+            self.session.start(self.position, max_depth, time_limit)
+            self._bounded = bool(max_depth or time_limit)
+            self._reporter = asyncio.ensure_future(self._report())
+        elif command == 'stop':
+            await self._stop_search()
+        elif command == 'quit':
+            await self._stop_search()
+            return False
+        else:
+            self.send(f"info string unknown command {command}")
+        return True
+
+    async def run(self):
+        """Читает команды из stdin до quit или конца ввода"""
+        loop = asyncio.get_running_loop()
+        while True:
+            line = await loop.run_in_executor(None, self.stdin.readline)
+            if not line:
+                # Ограниченный поиск доводим до конца, бесконечный останавливаем
+                if self._reporter is not None and self._bounded:
+                    await self._reporter
+                await self._stop_search()
+                return
+            if not await self.handle(line):
+                return
+
+
+if __name__ == "__main__":
+    game = sys.argv[1] if len(sys.argv) > 1 else 'qwe'
+    asyncio.run(UCIAdapter(game).run())
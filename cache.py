@@ -0,0 +1,268 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from snapshot import move_to_str, parse_move
+from symmetry import IDENTITY, canonical
+
+
+def cache_key(position):
+    """Ключ кэша: игра и ключ Зобриста снимка"""
+    return f"{position.game}:{position.key:016x}"
+
+
+class CacheEntry:
+    """Результат анализа позиции"""
+
+    __slots__ = ('move', 'score', 'depth', 'pv')
+
+    def __init__(self, move, score, depth, pv):
+        self.move = move  # Ход в записи консольных игр, например 'e2 e4'
+        self.score = score
+        self.depth = depth
+        self.pv = pv
+
+    @classmethod
+    def from_result(cls, result):
+        """Из engine.SearchResult"""
+        move = move_to_str(result.move) if result.move is not None else None
+        return cls(move, result.score, result.depth, [move_to_str(move) for move in result.pv])
+
+    def best_move(self):
+        """Ход в виде координат, как у Snapshot.moves()"""
+        return parse_move(self.move) if self.move else None
+
+    def transformed(self, transform):
+        """Та же запись в другой ориентации доски (см. symmetry.py)"""
+        if transform is IDENTITY:
+            return self
+        move = transform.move_str(self.move) if self.move else None
+        return CacheEntry(move, self.score, self.depth, [transform.move_str(move) for move in self.pv])
+
+    def to_json(self, key):
+        return json.dumps({'key': key, 'move': self.move, 'score': self.score, 'depth': self.depth, 'pv': self.pv})
+
+    @classmethod
+    def from_json(cls, line):
+        data = json.loads(line)
+        return data['key'], cls(data['move'], data['score'], data['depth'], data['pv'])
+
+
+class CacheStats:
+    """Счётчики обращений к кэшу"""
+
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+        self.rejected = 0  # Записи мельче уже сохранённых
+        self.compactions = 0
+        self.corrupt = 0  # Пропущенные при открытии испорченные строки журнала
+
+    def hit_rate(self):
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+    def as_dict(self):
+        data = dict(vars(self))
+        data['hit_rate'] = self.hit_rate()
+        return data
+
+
+class AnalysisCache:
+    """Кэш результатов анализа по ключу позиции.
+
+    Первый уровень - LRU в памяти на ``capacity`` записей. Второй,
+    если задан ``path``, - журнал на диске: записи только дописываются
+    в конец, а индекс в памяти хранит смещение и глубину последней записи
+    для каждого ключа. Когда устаревших строк становится больше живых в
+    ``compact_ratio`` раз, журнал переписывается в фоновом потоке.
+    Более глубокий результат заменяет более мелкий, но не наоборот.
+    С ``canonical=True`` симметричные позиции shashki и hex хранятся
+    одной записью, а ходы переводятся в ориентацию запроса.
+    """
+
+    def __init__(self, path=None, capacity=10000, compact_ratio=2.0, canonical=False):
+        self.path = path
+        self.canonical = canonical
+        self.capacity = capacity
+        self.compact_ratio = compact_ratio
+        self.stats = CacheStats()
+        self._memory = OrderedDict()
+        self._index = {}  # ключ -> (смещение, глубина)
+        self._lines = 0
+        self._lock = threading.RLock()
+        self._compactor = None
+        self._log = None
+        if path is not None:
+            self._open()
+
+    def _open(self):
+        """Открывает журнал и восстанавливает индекс.
+
+        Испорченная последняя строка - запись, оборванная при падении
+        процесса, - отрезается. Испорченные строки в середине журнала
+        пропускаются (их считает stats.corrupt) и исчезают при следующем
+        уплотнении; записи после них сохраняются.
+        """
+        self._index = {}
+        self._lines = 0
+        if os.path.exists(self.path):
+            size = os.path.getsize(self.path)
+            offset = 0
+            with open(self.path, 'rb') as log:
+                for line in log:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("Строка журнала оборвана")
+                        key, entry = CacheEntry.from_json(line)
+                    except (ValueError, KeyError, TypeError):
+                        if offset + len(line) == size:
+                            os.truncate(self.path, offset)
+                            break
+                        self.stats.corrupt += 1
+                    else:
+                        known = self._index.get(key)
+                        if known is None or entry.depth >= known[1]:
+                            self._index[key] = (offset, entry.depth)
+                    offset += len(line)
+                    self._lines += 1
+        self._log = open(self.path, 'a+b')
+
+    def close(self):
+        """Дожидается уплотнения и закрывает журнал"""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index) if self.path is not None else len(self._memory)
+
+    def _remember(self, key, entry):
+        """Кладёт запись в LRU, вытесняя самую старую при переполнении"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _read(self, offset):
+        self._log.seek(offset)
+        return CacheEntry.from_json(self._log.readline())[1]
+
+    def _orient(self, position):
+        """Ключ и преобразование в каноническую ориентацию"""
+        if not self.canonical:
+            return cache_key(position), IDENTITY
+        image, transform = canonical(position)
+        return cache_key(image), transform
+
+    def get(self, position, min_depth=0):
+        """Запись для позиции не мельче ``min_depth`` или None"""
+        key, transform = self._orient(position)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                if entry.depth >= min_depth:
+                    self.stats.memory_hits += 1
+                    return entry.transformed(transform)
+            elif self.path is not None and key in self._index:
+                entry = self._read(self._index[key][0])
+                if entry.depth >= min_depth:
+                    self._remember(key, entry)
+                    self.stats.disk_hits += 1
+                    return entry.transformed(transform)
+            self.stats.misses += 1
+            return None
+
+    def put(self, position, entry):
+        """Сохраняет результат; возвращает False, если уже есть более глубокий"""
+        key, transform = self._orient(position)
+        entry = entry.transformed(transform)
+        with self._lock:
+            known = self._memory.get(key)
+            depth = known.depth if known is not None else -1
+            if self.path is not None and key in self._index:
+                depth = max(depth, self._index[key][1])
+            if entry.depth < depth:
+                self.stats.rejected += 1
+                return False
+
+            self._remember(key, entry)
+            self.stats.stores += 1
+            if self.path is not None:
+                self._log.seek(0, os.SEEK_END)
+                offset = self._log.tell()
+                self._log.write((entry.to_json(key) + '\n').encode('utf-8'))
+                self._log.flush()
+                self._index[key] = (offset, entry.depth)
+                self._lines += 1
+                if self._lines > self.compact_ratio * max(len(self._index), 1) and self._compactor is None:
+                    self._compactor = threading.Thread(target=self.compact, daemon=True)
+                    self._compactor.start()
+            return True
+
+    def compact(self):
+        """Переписывает журнал, оставляя по одной записи на ключ.
+
+        Основная часть копируется без блокировки; записи, дописанные за это
+        время, переносятся в конце под блокировкой.
+        """
+        try:
+            with self._lock:
+                if self._log is None:
+                    return
+                snapshot = dict(self._index)
+                self._log.seek(0, os.SEEK_END)
+                end = self._log.tell()
+
+            temp_path = self.path + '.compact'
+            index = {}
+            source = open(self.path, 'rb')
+            target = open(temp_path, 'wb')
+            try:
+                for key, (offset, depth) in snapshot.items():
+                    source.seek(offset)
+                    index[key] = (target.tell(), depth)
+                    target.write(source.readline())
+
+                with self._lock:
+                    source.seek(end)
+                    for line in source:
+                        key, entry = CacheEntry.from_json(line)
+                        known = index.get(key)
+                        if known is None or entry.depth >= known[1]:
+                            index[key] = (target.tell(), entry.depth)
+                            target.write(line)
+                    source.close()
+                    target.close()
+                    self._log.close()
+                    os.replace(temp_path, self.path)
+                    self._log = open(self.path, 'a+b')
+                    self._index = index
+                    self._lines = len(index)
+                    self.stats.compactions += 1
+            finally:
+                source.close()
+                target.close()
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        finally:
+            self._compactor = None
@@ -0,0 +1,372 @@
+import multiprocessing
+import sys
+import time
+from array import array
+
+import qwe
+import shashki
+from cache import CacheEntry
+from profiling import Profiler, SearchStats
+from snapshot import PROMOTIONS, Snapshot, move_to_str, parse_move
+
+
+# Ценность фигур по имени класса
+PIECE_VALUES = {
+    'Pawn': 100,
+    'Knight': 320,
+    'Bishop': 330,
+    'Rook': 500,
+    'Queen': 900,
+    'King': 20000,
+    'Griffin': 650,
+    'Centaur': 550,
+    'Crossbowman': 450,
+}
+CHECKER_VALUE = 100
+CHECKER_KING_VALUE = 300
+
+INFINITY = 10 ** 9
+MATE = 10 ** 6
+
+EXACT, LOWER, UPPER = 1, 2, 3
+
+
+class SearchAborted(Exception):
+    """Поиск остановлен сигналом или по времени"""
+
+
+def evaluate(position):
+    """Материальная оценка позиции с точки зрения стороны, которая ходит"""
+    score = 0
+    for (row, _), piece in position.pieces():
+        if isinstance(piece, shashki.Checker):
+            value = CHECKER_KING_VALUE if piece.is_king else CHECKER_VALUE
+            # Небольшой бонус за продвижение простой шашки
+            if not piece.is_king:
+                value += 2 * (7 - row if piece.color == 'white' else row)
+        else:
+            value = PIECE_VALUES.get(type(piece).__name__, 0)
+        score += value if piece.color == position.turn else -value
+    return score
+
+
+def encode_move(move):
+    """Упаковывает ход в целое для таблицы транспозиций"""
+    if move is None:
+        return -1
+    (start_row, start_col), (end_row, end_col) = move[0], move[1]
+    code = (start_row * 8 + start_col) * 64 + end_row * 8 + end_col
+    if len(move) > 2 and move[2]:
+        code += 4096 * (PROMOTIONS.index(move[2]) + 1)
+    return code
+
+
+def decode_move(code):
+    """Обратное преобразование для encode_move"""
+    if code < 0:
+        return None
+    promotion, code = divmod(code, 4096)
+    start, end = divmod(code, 64)
+    move = (divmod(start, 8), divmod(end, 8))
+    if promotion:
+        move += (PROMOTIONS[promotion - 1],)
+    return move
+
+
+def _signed(key):
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+class TranspositionTable:
+    """Таблица транспозиций фиксированного размера в плоском массиве int64.
+
+    Запись занимает 5 ячеек: ключ, глубина + 1, тип оценки, оценка и ход.
+    С ``shared=True`` массив лежит в разделяемой памяти и его может
+    заполнять фоновый процесс. Блокировок нет: порванная запись
+    отсеивается проверкой ключа, а ход всё равно сверяется со списком ходов.
+    """
+
+    FIELDS = 5
+
+    def __init__(self, size=1 << 16, shared=False):
+        self.size = size
+        self.shared = shared
+        if shared:
+            self.data = multiprocessing.RawArray('q', size * self.FIELDS)
+        else:
+            self.data = array('q', bytes(8 * size * self.FIELDS))
+
+    def probe(self, key):
+        """Возвращает (глубина, тип, оценка, ход) или None"""
+        data = self.data
+        index = (key % self.size) * self.FIELDS
+        if data[index] != _signed(key) or not data[index + 1]:
+            return None
+        return data[index + 1] - 1, data[index + 2], data[index + 3], decode_move(data[index + 4])
+
+    def store(self, key, depth, flag, score, move):
+        data = self.data
+        index = (key % self.size) * self.FIELDS
+        data[index + 1] = depth + 1
+        data[index + 2] = flag
+        data[index + 3] = score
+        data[index + 4] = encode_move(move)
+        data[index] = _signed(key)
+
+    def clear(self):
+        for index in range(len(self.data)):
+            self.data[index] = 0
+
+
+class SearchResult:
+    """Итог завершённой итерации поиска"""
+
+    def __init__(self, move, score, depth, pv, nodes, elapsed):
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.pv = pv
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        pv = ', '.join(move_to_str(move) for move in self.pv)
+        return f"SearchResult(depth={self.depth}, score={self.score}, nodes={self.nodes}, pv=[{pv}])"
+
+
+class Engine:
+    """Перебор с альфа-бета отсечением, таблицей транспозиций и итеративным углублением.
+
+    Работает со снимками Snapshot любой из трёх игр. При ``ponder=True``
+    таблица транспозиций создаётся в разделяемой памяти, а пока человек
+    думает над ходом, фоновый процесс перебирает его вероятные ответы
+    (см. start_pondering). С ``cache`` результаты поиска сохраняются
+    в AnalysisCache и повторно не считаются.
+    """
+
+    def __init__(self, max_depth=4, time_limit=2.0, tt_size=1 << 16, ponder=False, ponder_width=None, tt=None,
+                 cache=None):
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.tt = tt if tt is not None else TranspositionTable(tt_size, shared=ponder)
+        self.ponder = ponder
+        self.cache = cache  # Необязательный cache.AnalysisCache
+        self.ponder_width = ponder_width
+        self.stats = SearchStats()
+        self._stop = None
+        self._deadline = None
+        self._root_move = None
+        self._ponder_process = None
+        self._ponder_stop = None
+
+    def _check_stop(self):
+        if self._stop is not None and self._stop.is_set():
+            raise SearchAborted
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchAborted
+
+    def _order(self, position, moves, tt_move):
+        """Сначала ход из таблицы, затем взятия по ценности жертвы"""
+        def priority(move):
+            if move == tt_move:
+                return -INFINITY
+            target = position.grid[move[1][0]][move[1][1]]
+            if target is None:
+                return 0
+            if isinstance(target, shashki.Checker):
+                return -CHECKER_VALUE
+            return -PIECE_VALUES.get(type(target).__name__, 0)
+
+        if position.game == 'shashki':
+            # Взятие в шашках - прыжок через клетку
+            return sorted(moves, key=lambda move: (move != tt_move, abs(move[0][0] - move[1][0]) != 2))
+        return sorted(moves, key=priority)
+
+    def _negamax(self, position, depth, alpha, beta, ply):
+        stats = self.stats
+        stats.nodes += 1
+        # Узел стоит дороже проверки, поэтому остановка проверяется в каждом узле
+        self._check_stop()
+
+        moves = position.moves()
+        winner = position.winner(moves)
+        if winner is not None:
+            return MATE - ply if winner == position.turn else ply - MATE
+        if depth <= 0:
+            return evaluate(position)
+
+        original_alpha = alpha
+        tt_move = None
+        stats.tt_probes += 1
+        entry = self.tt.probe(position.key)
+        if entry is not None:
+            stats.tt_hits += 1
+            entry_depth, flag, score, tt_move = entry
+            if entry_depth >= depth and ply > 0:
+                if flag == EXACT:
+                    return score
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                elif flag == UPPER:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        best_score = -INFINITY
+        best_move = None
+        for move in self._order(position, moves, tt_move):
+            child = position.play(move)
+            # В шашках после взятия может ходить та же сторона
+            if child.turn == position.turn:
+                score = self._negamax(child, depth - 1, alpha, beta, ply + 1)
+            else:
+                score = -self._negamax(child, depth - 1, -beta, -alpha, ply + 1)
+            if score > best_score:
+                best_score, best_move = score, move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                stats.cutoffs += 1
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(position.key, depth, flag, best_score, best_move)
+        if ply == 0:
+            self._root_move = best_move
+        return best_score
+
+    def principal_variation(self, position, depth):
+        """Главная линия, восстановленная по таблице транспозиций"""
+        pv = []
+        seen = set()
+        while len(pv) < depth and position.key not in seen:
+            seen.add(position.key)
+            entry = self.tt.probe(position.key)
+            if entry is None or entry[3] not in position.moves():
+                break
+            pv.append(entry[3])
+            position = position.play(entry[3])
+        return pv
+
+    def search(self, position, max_depth=None, time_limit=None, stop=None, on_iteration=None):
+        """Итеративное углубление до ``max_depth`` или до остановки.
+
+        ``stop`` - любой объект с методом is_set() (threading.Event,
+        multiprocessing.Event). ``on_iteration`` вызывается с
+        SearchResult после каждой завершённой глубины. Возвращает
+        результат последней завершённой итерации; если не завершилась ни
+        одна, ход - первый из допустимых.
+        """
+        max_depth = self.max_depth if max_depth is None else max_depth
+        time_limit = self.time_limit if time_limit is None else time_limit
+        self.stats = SearchStats()
+        if self.cache is not None:
+            entry = self.cache.get(position, max_depth)
+            if entry is not None:
+                pv = [parse_move(move) for move in entry.pv]
+                result = SearchResult(entry.best_move(), entry.score, entry.depth, pv, 0, 0.0)
+                if on_iteration is not None:
+                    on_iteration(result)
+                return result
+
+        start = time.perf_counter()
+        self._stop = stop
+        self._deadline = start + time_limit if time_limit else None
+
+        moves = position.moves()
+        result = SearchResult(moves[0] if moves else None, 0, 0, [], 0, 0.0)
+        try:
+            for depth in range(1, max_depth + 1):
+                self._root_move = None
+                score = self._negamax(position, depth, -INFINITY, INFINITY, 0)
+                pv = self.principal_variation(position, depth)
+                if self._root_move is not None and (not pv or pv[0] != self._root_move):
+                    pv = [self._root_move]
+                result = SearchResult(self._root_move, score, depth, pv, self.stats.nodes,
+                                      time.perf_counter() - start)
+                if on_iteration is not None:
+                    on_iteration(result)
+                if abs(score) >= MATE - depth:
+                    break
+        except SearchAborted:
+            pass
+        finally:
+            self._stop = None
+            self._deadline = None
+        if Profiler.active is not None:
+            Profiler.active.record_search(self.stats)
+        if self.cache is not None and result.depth:
+            self.cache.put(position, CacheEntry.from_result(result))
+        return result
+
+    def choose_move(self, board, turn):
+        """Ход для доски любой из игр в записи консольных игр, или None"""
+        result = self.search(Snapshot.from_board(board, turn))
+        return move_to_str(result.move) if result.move is not None else None
+
+    def start_pondering(self, board, turn):
+        """Запускает фоновый перебор ответов, пока человек думает"""
+        if not self.ponder:
+            return
+        self.stop_pondering()
+        self._ponder_stop = multiprocessing.Event()
+        self._ponder_process = multiprocessing.Process(
+            target=_ponder,
+            args=(self.tt, Snapshot.from_board(board, turn), self._ponder_stop, self.max_depth, self.ponder_width),
+            daemon=True,
+        )
+        self._ponder_process.start()
+
+    def stop_pondering(self, timeout=0.5):
+        """Останавливает фоновый перебор; заполненная им таблица остаётся"""
+        if self._ponder_process is None:
+            return
+        self._ponder_stop.set()
+        self._ponder_process.join(timeout)
+        if self._ponder_process.is_alive():
+            self._ponder_process.terminate()
+            self._ponder_process.join()
+        self._ponder_process = None
+        self._ponder_stop = None
+
+
+def _ponder(tt, position, stop, max_depth, width):
+    """Фоновый процесс: углубляет перебор позиций после вероятных ответов человека"""
+    engine = Engine(max_depth=max_depth, time_limit=0, tt=tt)
+    engine._stop = stop
+    try:
+        moves = position.moves()
+        if position.winner(moves) is not None:
+            return
+        # Вероятные ответы - лучшие по неглубокой оценке
+        replies = []
+        for move in moves:
+            child = position.play(move)
+            score = engine._negamax(child, 1, -INFINITY, INFINITY, 1)
+            replies.append((score if child.turn == position.turn else -score, move))
+        replies.sort(key=lambda item: -item[0])
+        children = [position.play(move) for _, move in replies[:width]]
+
+        # Углубляем все ответы по очереди, начиная с самых вероятных
+
+        for depth in range(1, max_depth + 1):
+            for child in children:
+                engine._negamax(child, depth, -INFINITY, INFINITY, 0)
+    except SearchAborted:
+        pass
+
+
+GAMES = {
+    'qwe': lambda engine: qwe.ChessGame(engine=engine),
+    'shashki': lambda engine: shashki.CheckersGame(engine=engine),
+}
+
+
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else 'qwe'
+    game = GAMES[name](Engine(ponder=True))
+    game.play()
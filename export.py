@@ -0,0 +1,261 @@
+import bisect
+import json
+import os
+import random
+from multiprocessing import Pool
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для экспорта обучающих данных
+    np = None
+
+import hex
+import qwe
+import shashki
+from snapshot import Snapshot, parse_move
+
+
+# Плоскости кодирования: (класс фигуры, цвет, состояние) по играм
+PLANES = {
+    'qwe': [(cls, color, None)
+            for color in ('white', 'black')
+            for cls in (qwe.Pawn, qwe.Knight, qwe.Bishop, qwe.Rook, qwe.Queen, qwe.King)],
+    'hex': [(cls, color, None)
+            for color in ('white', 'black')
+            for cls in (hex.Pawn, hex.Knight, hex.Bishop, hex.Rook, hex.Queen, hex.King,
+                        hex.Griffin, hex.Centaur, hex.Crossbowman)],
+    'shashki': [(shashki.Checker, color, is_king)
+                for color in ('white', 'black')
+                for is_king in (False, True)],
+}
+
+ARRAYS = ('planes', 'turn', 'result', 'score', 'key')
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("Для экспорта обучающих данных нужен numpy")
+
+
+def _plane_index(game):
+    return {spec: index for index, spec in enumerate(PLANES[game])}
+
+
+def encode_cells(position, index=None):
+    """64 байта: номер плоскости фигуры на клетке плюс один, 0 - пусто"""
+    index = index or _plane_index(position.game)
+    cells = bytearray(64)
+    for (row, col), piece in position.pieces():
+        state = piece.is_king if position.game == 'shashki' else None
+        cells[row * 8 + col] = index[(type(piece), piece.color, state)] + 1
+    return bytes(cells)
+
+
+def _result_label(winner):
+    """Итог партии с точки зрения белых"""
+    if winner == 'white':
+        return 1
+    if winner == 'black':
+        return -1
+    return 0
+
+
+def replay_positions(game, start, moves, winner=None):
+    """Позиции партии из архива: (снимок, итог, оценка поиска).
+
+    Ходы задаются строками вида 'e2 e4'; оценки в архиве нет, поэтому 0.
+    """
+    position = Snapshot.initial(game) if start is None else Snapshot.from_board(start)
+    result = _result_label(winner)
+    yield position, result, 0
+    for move in moves:
+        position = position.play(parse_move(move))
+        yield position, result, 0
+
+
+def self_play_positions(game, games, engine=None, seed=None, max_moves=200):
+    """Позиции партий движка с самим собой (или случайных, если движка нет).
+
+    Итог партии известен только в конце, поэтому позиции одной партии
+    держатся в памяти до её окончания. Оценка, как и итог, дана с точки
+    зрения белых (negamax считает её со стороны, которая ходит).
+    """
+    rng = random.Random(seed)
+    for _ in range(games):
+        position = Snapshot.initial(game)
+        samples = []
+        winner = None
+        for _ in range(max_moves):
+            moves = position.moves()
+            winner = position.winner(moves)
+            if winner is not None:
+                break
+            if engine is not None:
+                search = engine.search(position)
+                move, score = search.move, search.score
+                if position.turn == 'black':
+                    score = -score
+            else:
+                move, score = rng.choice(moves), 0
+            samples.append((position, score))
+            position = position.play(move)
+        result = _result_label(winner)
+        for position, score in samples:
+            yield position, result, score
+
+
+def _write_shard(directory, name, game, samples):
+    """Кодирует и записывает один шард; выполняется в процессе пула"""
+    count = len(samples)
+    cells = np.frombuffer(b''.join(sample[0] for sample in samples), dtype=np.uint8).reshape(count, 64)
+    planes = np.arange(1, len(PLANES[game]) + 1, dtype=np.uint8)
+    arrays = {
+        'planes': (cells[:, None, :] == planes[None, :, None]).astype(np.uint8).reshape(count, -1, 8, 8),
+        'turn': np.array([sample[1] for sample in samples], dtype=np.int8),
+        'result': np.array([sample[2] for sample in samples], dtype=np.int8),
+        'score': np.array([sample[3] for sample in samples], dtype=np.int32),
+        'key': np.array([sample[4] for sample in samples], dtype=np.uint64),
+    }
+    for field, values in arrays.items():
+        np.save(os.path.join(directory, f"{name}.{field}.npy"), values)
+    return name, count
+
+
+class ShardWriter:
+    """Потоковая запись позиций в шарды .npy фиксированного размера.
+
+    В памяти держится не больше ``max_pending`` шардов: пока они
+    кодируются и пишутся процессами пула, следующий набирается в основном
+    процессе. Позиции с уже встречавшимся ключом пропускаются: ключи
+    записанных шардов хранятся отсортированным массивом uint64 (8 байт на
+    уникальную позицию), а ключи набираемого шарда - множеством, которое
+    вливается в массив при записи шарда. Каждый шард -
+    набор файлов name.planes.npy, name.turn.npy, name.result.npy,
+    name.score.npy и name.key.npy, которые читаются через mmap. Итог и
+    оценка записываются с точки зрения белых (поле perspective манифеста).
+    """
+
+    def __init__(self, directory, game, shard_size=65536, processes=2, max_pending=None, dedupe=True):
+        _require_numpy()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.game = game
+        self.shard_size = shard_size
+        self.dedupe = dedupe
+        self.max_pending = max_pending or 2 * processes
+        self.pool = Pool(processes) if processes > 1 else None
+        self.shards = []  # (имя, размер) в порядке записи
+        self.duplicates = 0
+        self._seen = np.empty(0, dtype=np.uint64)  # Ключи записанных шардов, по возрастанию
+        self._recent = set()  # Ключи набираемого шарда
+        self._buffer = []
+        self._pending = []
+        self._index = _plane_index(game)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def add(self, position, result, score=0):
+        """Добавляет позицию; возвращает False для дубликата"""
+        if self.dedupe:
+            if self._is_duplicate(position.key):
+                self.duplicates += 1
+                return False
+            self._recent.add(position.key)
+        turn = 1 if position.turn == 'white' else -1
+        self._buffer.append((encode_cells(position, self._index), turn, result, score, position.key))
+        if len(self._buffer) >= self.shard_size:
+            self._flush()
+        return True
+
+    def _is_duplicate(self, key):
+        if key in self._recent:
+            return True
+        key = np.uint64(key)
+        index = self._seen.searchsorted(key)
+        return index < len(self._seen) and self._seen[index] == key
+
+    def extend(self, samples):
+        """Добавляет поток (снимок, итог, оценка)"""
+        for position, result, score in samples:
+            self.add(position, result, score)
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        if self._recent:
+            recent = np.fromiter(self._recent, dtype=np.uint64, count=len(self._recent))
+            self._seen = np.union1d(self._seen, recent)
+            self._recent = set()
+        name = f"shard_{len(self.shards) + len(self._pending):05d}"
+        args = (self.directory, name, self.game, self._buffer)
+        self._buffer = []
+        if self.pool is None:
+            self.shards.append(_write_shard(*args))
+            return
+        self._pending.append(self.pool.apply_async(_write_shard, args))
+        while len(self._pending) >= self.max_pending:
+            self.shards.append(self._pending.pop(0).get())
+
+    def close(self):
+        """Дописывает последний шард и манифест"""
+        self._flush()
+        while self._pending:
+            self.shards.append(self._pending.pop(0).get())
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        manifest = {
+            'game': self.game,
+            'perspective': 'white',  # Знак result и score: плюс - в пользу белых
+            'planes': [f"{cls.__name__}:{color}" + (':king' if state else '')
+                       for cls, color, state in PLANES[self.game]],
+            'shards': [{'name': name, 'size': size} for name, size in self.shards],
+        }
+        with open(os.path.join(self.directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+
+class ShardReader:
+    """Произвольный доступ к экспортированным позициям через mmap"""
+
+    def __init__(self, directory):
+        _require_numpy()
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.names = [shard['name'] for shard in self.manifest['shards']]
+        self.offsets = [0]
+        for shard in self.manifest['shards']:
+            self.offsets.append(self.offsets[-1] + shard['size'])
+        self._open = {}
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def shard(self, number):
+        """Массивы одного шарда, отображённые в память"""
+        arrays = self._open.get(number)
+        if arrays is None:
+            name = self.names[number]
+            arrays = {
+                field: np.load(os.path.join(self.directory, f"{name}.{field}.npy"), mmap_mode='r')
+                for field in ARRAYS
+            }
+            self._open[number] = arrays
+        return arrays
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        number = bisect.bisect_right(self.offsets, index) - 1
+        arrays = self.shard(number)
+        offset = index - self.offsets[number]
+        return {field: arrays[field][offset] for field in ARRAYS}
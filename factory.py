@@ -0,0 +1,157 @@
+import copy
+import time
+from array import array
+
+import hex
+import qwe
+import shashki
+
+
+GAMES = {
+    'qwe': qwe,
+    'hex': hex,
+    'shashki': shashki,
+}
+
+_flyweights = {}
+_templates = {}
+
+
+def piece_state(piece):
+    """Изменяемое состояние фигуры, которое влияет на её ходы"""
+    if isinstance(piece, shashki.Checker):
+        return piece.is_king
+    return getattr(piece, 'has_moved', False)
+
+
+def flyweight(cls, color, state=False):
+    """Возвращает общий экземпляр фигуры с флагом ``shared``.
+
+    Для каждого сочетания класса, цвета и состояния (has_moved или
+    is_king) создаётся ровно один объект. Доски не меняют его сами:
+    перед изменением фигура заменяется копией через unshare().
+    """
+    lookup = (cls, color, state)
+    piece = _flyweights.get(lookup)
+    if piece is None:
+        piece = cls(color)
+        if isinstance(piece, shashki.Checker):
+            piece.is_king = state
+        else:
+            piece.has_moved = state
+        piece.shared = True
+        _flyweights[lookup] = piece
+    return piece
+
+
+def _copy_value(value):
+    """Копия изменяемого атрибута доски; неизменяемые возвращаются как есть"""
+    if isinstance(value, (list, dict, set, bytearray, array)):
+        return copy.copy(value)
+    return value
+
+
+class Template:
+    """Неизменяемая начальная расстановка игры.
+
+    Хранит 64 клетки одним кортежем общих фигур и остальные атрибуты
+    доски, собранной обычным конструктором один раз.
+    """
+
+    def __init__(self, game):
+        board = GAMES[game].Board()
+        self.board_type = type(board)
+        self.cells = tuple(
+            flyweight(type(piece), piece.color, piece_state(piece)) if piece else None
+            for row in board.grid for piece in row
+        )
+        self.attributes = {name: value for name, value in vars(board).items() if name != 'grid'}
+
+    def fill(self, board):
+        """Приводит доску к начальной расстановке, переиспользуя её ряды"""
+        cells = self.cells
+        grid = board.__dict__.get('grid')
+        if grid is None or len(grid) != 8:
+            grid = [list(cells[start:start + 8]) for start in range(0, 64, 8)]
+        else:
+            for row in range(8):
+                grid[row][:] = cells[row * 8:row * 8 + 8]
+        board.__dict__.update((name, _copy_value(value)) for name, value in self.attributes.items())
+        board.grid = grid
+        return board
+
+    def new_board(self):
+        return self.fill(self.board_type.__new__(self.board_type))
+
+
+def template(game):
+    """Общий шаблон начальной расстановки игры"""
+    result = _templates.get(game)
+    if result is None:
+        result = _templates[game] = Template(game)
+    return result
+
+
+def new_board(game):
+    """Доска в начальной расстановке без вызова setup_board().
+
+    Фигуры общие с шаблоном и копируются только при первом изменении
+    (ход с has_moved, превращение в дамку).
+    """
+    return template(game).new_board()
+
+
+class BoardPool:
+    """Пул досок для повторного использования без новых выделений"""
+
+    def __init__(self, game, size=64):
+        self.template = template(game)
+        self.size = size
+        self._free = []
+
+    def acquire(self):
+        """Доска в начальной расстановке"""
+        if self._free:
+            return self.template.fill(self._free.pop())
+        return self.template.new_board()
+
+    def release(self, board):
+        """Возвращает доску в пул"""
+        if len(self._free) < self.size:
+            self._free.append(board)
+
+    def __len__(self):
+        return len(self._free)
+
+
+def benchmark(game='qwe', count=20000):
+    """Сколько досок в секунду создают Board(), new_board() и BoardPool"""
+    board_type = GAMES[game].Board
+    start = time.perf_counter()
+    for _ in range(count):
+        board_type()
+    constructor = time.perf_counter() - start
+
+    template(game)
+    start = time.perf_counter()
+    for _ in range(count):
+        new_board(game)
+    cloned = time.perf_counter() - start
+
+    pool = BoardPool(game, size=1)
+    start = time.perf_counter()
+    for _ in range(count):
+        pool.release(pool.acquire())
+    pooled = time.perf_counter() - start
+
+    return {
+        'boards': count,
+        'constructor_per_second': count / constructor,
+        'template_per_second': count / cloned,
+        'pool_per_second': count / pooled,
+    }
+
+
+if __name__ == "__main__":
+    for name in GAMES:
+        print(name, benchmark(name))
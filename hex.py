@@ -1,10 +1,20 @@
 class Piece:
     """Базовый класс для всех шахматных фигур"""
 
+    shared = False  # Общий экземпляр из шаблона доски (см. factory.py)
+
     def __init__(self, color):
         self.color = color  # 'white' или 'black'
         self.has_moved = False
 
+    def unshare(self):
+        """Собственная копия общей фигуры перед изменением (copy-on-write)"""
+        if not self.shared:
+            return self
+        piece = type(self)(self.color)
+        piece.has_moved = self.has_moved
+        return piece
+
     def symbol(self):
         """Возвращает символ фигуры"""
         raise NotImplementedError
@@ -196,6 +206,8 @@ class Crossbowman(Piece):
 class Board:
     """Шахматная доска"""
 
+    EMPTY = '.'  # Символ пустой клетки
+
     def __init__(self):
         self.grid = [[None for _ in range(8)] for _ in range(8)]
         self.setup_board()
@@ -228,16 +240,18 @@ class Board:
         self.grid[0][4] = King('black')
         self.grid[7][4] = King('white')
 
+    def render(self):
+        """Возвращает изображение доски одной строкой"""
+        lines = ["  a b c d e f g h"]
+        for row in range(8):
+            cells = ''.join(f"{piece.symbol() if piece else self.EMPTY} " for piece in self.grid[row])
+            lines.append(f"{8 - row} {cells}{8 - row}")
+        lines.append("  a b c d e f g h")
+        return '\n'.join(lines)
+
     def display(self):
         """Отображение доски"""
-        print("  a b c d e f g h")
-        for row in range(8):
-            print(f"{8 - row} ", end="")
-            for col in range(8):
-                piece = self.grid[row][col]
-                print(piece.symbol() if piece else '.', end=" ")
-            print(f"{8 - row}")
-        print("  a b c d e f g h")
+        print(self.render())
 
     def move_piece(self, start, end):
         """Выполнение хода"""
@@ -257,11 +271,16 @@ class Board:
             print("Невозможно выполнить такой ход")
             return False
 
+        self.make_move(start_pos, end_pos)
+        return True
+
+    def make_move(self, start_pos, end_pos):
+        """Выполняет уже проверенный ход без вывода в консоль"""
+        piece = self.grid[start_pos[0]][start_pos[1]].unshare()
         self.grid[end_pos[0]][end_pos[1]] = piece
         self.grid[start_pos[0]][start_pos[1]] = None
         piece.update_position()
         self.move_count += 1
-        return True
 
     def parse_position(self, pos_str):
         """Преобразование строки в координаты"""
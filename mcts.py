@@ -0,0 +1,391 @@
+import math
+import random
+import time
+from multiprocessing import Pool
+
+import hex
+import shashki
+from snapshot import Snapshot, move_to_str
+
+
+# Коды фигур лёгкой доски hex; знак - цвет (+ белые, - черные)
+HEX_CODES = {
+    hex.Pawn: 1,
+    hex.Rook: 2,
+    hex.Knight: 3,
+    hex.Bishop: 4,
+    hex.Queen: 5,
+    hex.King: 6,
+    hex.Griffin: 7,
+    hex.Centaur: 8,
+    hex.Crossbowman: 9,
+}
+PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING, GRIFFIN, CENTAUR, CROSSBOWMAN = range(1, 10)
+
+DIAGONALS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+ORTHOGONALS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+KNIGHT_STEPS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+
+
+def _on_board(row, col):
+    return 0 <= row < 8 and 0 <= col < 8
+
+
+def _steps(deltas):
+    """Для каждой клетки - клетки, достижимые одним прыжком"""
+    return [[(row + dr) * 8 + col + dc for dr, dc in deltas if _on_board(row + dr, col + dc)]
+            for row in range(8) for col in range(8)]
+
+
+def _rays(deltas):
+    """Для каждой клетки - лучи клеток в заданных направлениях"""
+    table = []
+    for row in range(8):
+        for col in range(8):
+            rays = []
+            for dr, dc in deltas:
+                ray = []
+                r, c = row + dr, col + dc
+                while _on_board(r, c):
+                    ray.append(r * 8 + c)
+                    r, c = r + dr, c + dc
+                if ray:
+                    rays.append(ray)
+            table.append(rays)
+    return table
+
+
+KNIGHT_TARGETS = _steps(KNIGHT_STEPS)
+KING_TARGETS = _steps(DIAGONALS + ORTHOGONALS)
+ORTHOGONAL_RAYS = _rays(ORTHOGONALS)
+DIAGONAL_RAYS = _rays(DIAGONALS)
+
+
+def to_cells(position):
+    """Переводит снимок в плоский список из 64 кодов фигур"""
+    cells = []
+    for row in position.grid:
+        for piece in row:
+            if piece is None:
+                cells.append(0)
+                continue
+            if position.game == 'shashki':
+                code = 2 if piece.is_king else 1
+            else:
+                code = HEX_CODES[type(piece)]
+            cells.append(code if piece.color == 'white' else -code)
+    return cells
+
+
+def _shashki_moves(cells, side):
+    moves = []
+    for square in range(64):
+        piece = cells[square]
+        if piece * side <= 0:
+            continue
+        row, col = divmod(square, 8)
+        for dr, dc in DIAGONALS:
+            if _on_board(row + 2 * dr, col + 2 * dc):
+                target = square + 16 * dr + 2 * dc
+                if cells[target] == 0 and cells[square + 8 * dr + dc] * side < 0:
+                    moves.append((square, target))
+        # Простой ход как в Checker.can_move: дамка ходит только на ряд вниз
+        dr = 1 if abs(piece) == 2 or side < 0 else -1
+        for dc in (-1, 1):
+            if _on_board(row + dr, col + dc) and cells[square + 8 * dr + dc] == 0:
+                moves.append((square, square + 8 * dr + dc))
+    return moves
+
+
+def _shashki_can_capture_again(cells, square):
+    piece = cells[square]
+    side = 1 if piece > 0 else -1
+    row, col = divmod(square, 8)
+    if abs(piece) == 2:
+        directions = DIAGONALS
+    else:
+        directions = DIAGONALS[:2] if side > 0 else DIAGONALS[2:]
+    for dr, dc in directions:
+        if (_on_board(row + 2 * dr, col + 2 * dc) and cells[square + 16 * dr + 2 * dc] == 0 and
+                cells[square + 8 * dr + dc] * side < 0):
+            return True
+    return False
+
+
+def _shashki_playout(cells, side, rng, max_moves):
+    """Случайная партия до конца; возвращает +1, -1 или 0 (ничья)"""
+    for _ in range(max_moves):
+        moves = _shashki_moves(cells, side)
+        if not moves:
+            return -side
+        start, end = rng.choice(moves)
+        piece = cells[start]
+        cells[start] = 0
+        captured = abs(end - start) in (14, 18)
+        if captured:
+            cells[(start + end) // 2] = 0
+        if (side > 0 and end < 8) or (side < 0 and end >= 56):
+            piece = 2 * side
+        cells[end] = piece
+        if not (captured and _shashki_can_capture_again(cells, end)):
+            side = -side
+    return 0
+
+
+def _hex_moves(cells, side):
+    moves = []
+    for square in range(64):
+        piece = cells[square] * side
+        if piece <= 0:
+            continue
+        targets = []
+        if piece == PAWN:
+            row, col = divmod(square, 8)
+            dr = -1 if side > 0 else 1
+            if _on_board(row + dr, col):
+                ahead = square + 8 * dr
+                if cells[ahead] == 0:
+                    targets.append(ahead)
+                    if row == (6 if side > 0 else 1) and cells[ahead + 8 * dr] == 0:
+                        targets.append(ahead + 8 * dr)
+                for dc in (-1, 1):
+                    if _on_board(row + dr, col + dc) and cells[ahead + dc] * side < 0:
+                        targets.append(ahead + dc)
+            moves.extend((square, target) for target in targets)
+            continue
+
+        if piece in (KNIGHT, GRIFFIN, CENTAUR):
+            targets.extend(KNIGHT_TARGETS[square])
+        if piece in (KING, CENTAUR):
+            targets.extend(KING_TARGETS[square])
+        rays = []
+        if piece in (ROOK, QUEEN):
+            rays.extend(ORTHOGONAL_RAYS[square])
+        if piece in (BISHOP, QUEEN, GRIFFIN):
+            rays.extend(DIAGONAL_RAYS[square])
+        for ray in rays:
+            for target in ray:
+                targets.append(target)
+                if cells[target]:
+                    break
+        if piece == CROSSBOWMAN:
+            for ray in ORTHOGONAL_RAYS[square]:
+                for distance, target in enumerate(ray[:3]):
+                    if distance:
+                        targets.append(target)
+                    if cells[target]:
+                        break
+        moves.extend((square, target) for target in set(targets) if cells[target] * side <= 0)
+    return moves
+
+
+def _hex_playout(cells, side, rng, max_moves):
+    """Случайная партия до взятия короля; возвращает +1, -1 или 0 (ничья)"""
+    for _ in range(max_moves):
+        moves = _hex_moves(cells, side)
+        if not moves:
+            return -side
+        start, end = rng.choice(moves)
+        captured = cells[end]
+        cells[end] = cells[start]
+        cells[start] = 0
+        if abs(captured) == KING:
+            return side
+        side = -side
+    return 0
+
+
+PLAYOUTS = {
+    'shashki': _shashki_playout,
+    'hex': _hex_playout,
+}
+
+
+def playout(game, cells, side, seed, max_moves=200):
+    """Одна случайная партия на лёгкой доске (доступна пулу процессов)"""
+    return PLAYOUTS[game](list(cells), side, random.Random(seed), max_moves)
+
+
+def _playout_job(args):
+    return playout(*args)
+
+
+class Node:
+    """Узел дерева поиска"""
+
+    __slots__ = ('position', 'parent', 'move', 'children', 'untried', 'winner', 'visits', 'wins')
+
+    def __init__(self, position, parent=None, move=None, rng=random):
+        self.position = position
+        self.parent = parent
+        self.move = move
+        self.children = {}
+        self.untried = position.moves()
+        rng.shuffle(self.untried)
+        self.winner = position.winner(self.untried)
+        self.visits = 0
+        self.wins = 0.0  # С точки зрения игрока, сделавшего ход в этот узел
+
+    def expand(self, rng):
+        """Раскрывает один случайный нераскрытый ход"""
+        move = self.untried.pop()
+        child = Node(self.position.play(move), self, move, rng)
+        self.children[move] = child
+        return child
+
+    def best_child(self, exploration):
+        log_visits = math.log(self.visits)
+        return max(
+            self.children.values(),
+            key=lambda child: child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits),
+        )
+
+
+class MCTSPlayer:
+    """Игрок по методу Монте-Карло (UCT) для shashki и hex.
+
+    Дерево строится на снимках Snapshot, а случайные партии разыгрываются
+    на плоском списке кодов без создания объектов фигур. Дерево
+    сохраняется между ходами, а при ``processes`` больше 1 листья
+    разыгрываются пачками по ``batch_size`` в пуле процессов. Пул
+    создаётся при первом поиске и останавливается close() или при выходе
+    из блока with.
+    """
+
+    def __init__(self, game='shashki', exploration=1.4, max_moves=200, processes=1, batch_size=8, seed=None):
+        if game not in PLAYOUTS:
+            raise ValueError(f"MCTS поддерживает только shashki и hex, а не {game}")
+        self.game = game
+        self.exploration = exploration
+        self.max_moves = max_moves
+        self.batch_size = batch_size if processes > 1 else 1
+        self.rng = random.Random(seed)
+        self.processes = processes
+        self.pool = None
+        self.root = None
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Останавливает пул процессов"""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def set_position(self, position):
+        """Делает позицию корнем, по возможности переиспользуя дерево"""
+        if self.root is not None:
+            # Ищем позицию среди потомков до глубины 2 (наш ход и ответ)
+            frontier = [self.root]
+            for _ in range(3):
+                for node in frontier:
+                    if node.position == position:
+                        node.parent = None
+                        self.root = node
+                        return
+                frontier = [child for node in frontier for child in node.children.values()]
+        self.root = Node(position, rng=self.rng)
+
+    def _require_root(self):
+        if self.root is None:
+            raise RuntimeError("Позиция не задана: сначала set_position()")
+
+    def advance(self, move):
+        """Переносит корень на ход, сделанный в партии"""
+        self._require_root()
+        child = self.root.children.get(move)
+        if child is None:
+            child = Node(self.root.position.play(move), rng=self.rng)
+        child.parent = None
+        self.root = child
+
+    def _select(self):
+        """Спуск до листа с временным штрафом, чтобы пачка не выбирала один лист"""
+        node = self.root
+        while node.winner is None:
+            if node.untried:
+                node = node.expand(self.rng)
+                break
+            node = node.best_child(self.exploration)
+        leaf = node
+        while node is not None:
+            node.visits += 1
+            node = node.parent
+        return leaf
+
+    def _backpropagate(self, node, result):
+        while node.parent is not None:
+            mover = 1 if node.parent.position.turn == 'white' else -1
+            if result == mover:
+                node.wins += 1.0
+            elif result == 0:
+                node.wins += 0.5
+            node = node.parent
+
+    def search(self, playouts=1000, time_limit=None):
+        """Выполняет поиск из текущего корня и возвращает лучший ход"""
+        self._require_root()
+        if self.pool is None and self.processes > 1:
+            self.pool = Pool(self.processes)
+        start = time.perf_counter()
+        done = 0
+        while done < playouts:
+            if time_limit is not None and time.perf_counter() - start >= time_limit:
+                break
+            leaves = [self._select() for _ in range(min(self.batch_size, playouts - done))]
+            pending = [leaf for leaf in leaves if leaf.winner is None]
+            jobs = [(self.game, to_cells(leaf.position), 1 if leaf.position.turn == 'white' else -1,
+                     self.rng.getrandbits(32), self.max_moves) for leaf in pending]
+            if self.pool is not None:
+                results = self.pool.map(_playout_job, jobs)
+            else:
+                results = [_playout_job(job) for job in jobs]
+            for leaf, result in zip(pending, results):
+                self._backpropagate(leaf, result)
+            for leaf in leaves:
+                if leaf.winner is not None:
+                    self._backpropagate(leaf, 1 if leaf.winner == 'white' else -1)
+            done += len(leaves)
+
+        self.playouts += done
+        self.elapsed += time.perf_counter() - start
+        if not self.root.children:
+            return None
+        return max(self.root.children.values(), key=lambda child: child.visits).move
+
+    def choose_move(self, board, turn, playouts=1000, time_limit=None):
+        """Выбирает ход для доски shashki.Board или hex.Board.
+
+        Возвращает ход в записи консольных игр ('a3 b4') или None,
+        если ходов нет.
+        """
+        self.set_position(Snapshot.from_board(board, turn))
+        move = self.search(playouts, time_limit)
+        return move_to_str(move) if move is not None else None
+
+    def playouts_per_second(self):
+        return self.playouts / self.elapsed if self.elapsed else 0.0
+
+    def report(self):
+        """Статистика поиска"""
+        return {
+            'playouts': self.playouts,
+            'seconds': self.elapsed,
+            'playouts_per_second': self.playouts_per_second(),
+            'root_visits': self.root.visits if self.root else 0,
+        }
+
+
+if __name__ == "__main__":
+    board = shashki.Board()
+    with MCTSPlayer('shashki', seed=1) as player:
+        print(player.choose_move(board, 'white', playouts=500))
+        print(player.report())
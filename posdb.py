@@ -0,0 +1,229 @@
+import bisect
+import pickle
+from array import array
+
+import hex
+import qwe
+import shashki
+from snapshot import Snapshot, flyweight, parse_move
+
+
+# Порядок букв в материальной сигнатуре по играм
+MATERIAL_ORDER = {
+    'qwe': 'KQRBNP',
+    'hex': 'KQACGRBNP',
+    'shashki': 'KM',
+}
+EMPTY = '.'
+
+
+def _piece_letter(game, piece):
+    """Буква фигуры без учёта цвета: K, Q, ... или для шашек K (дамка) и M"""
+    if game == 'shashki':
+        return 'K' if piece.is_king else 'M'
+    return piece.symbol().upper()
+
+
+def _symbol_table(game):
+    """Символ -> (класс, цвет, дамка) для восстановления снимка"""
+    table = {}
+    if game == 'shashki':
+        for color in ('white', 'black'):
+            for is_king in (False, True):
+                table[flyweight(shashki.Checker, color, is_king).symbol()] = (shashki.Checker, color, is_king)
+        return table
+    module = {'qwe': qwe, 'hex': hex}[game]
+    for cls in vars(module).values():
+        if isinstance(cls, type) and issubclass(cls, module.Piece) and cls is not module.Piece:
+            for color in ('white', 'black'):
+                table[cls(color).symbol()] = (cls, color, None)
+    return table
+
+
+def normalize_material(game, white, black):
+    """Сигнатура вида 'KRP-KR' из наборов букв в любом порядке"""
+    order = MATERIAL_ORDER[game]
+    def sort(letters):
+        return ''.join(sorted(letters.upper(), key=order.index))
+    return f"{sort(white)}-{sort(black)}"
+
+
+def _square_index(name):
+    row, col = parse_move(name)[0]
+    return row * 8 + col
+
+
+def _intersect(candidates, posting):
+    """Пересечение отсортированного списка кандидатов с отсортированной постинг-листой"""
+    result = []
+    for item in candidates:
+        index = bisect.bisect_left(posting, item)
+        if index < len(posting) and posting[index] == item:
+            result.append(item)
+    return result
+
+
+class PositionDatabase:
+    """База позиций с инвертированными индексами.
+
+    Позиции хранятся один раз на пару (строка из 64 символов фигур,
+    сторона на ходу), и по этой же паре ищется номер позиции: флаги
+    has_moved, которые входят в ключ Зобриста снимка, база не хранит.
+    Индексы:
+
+    * материальная сигнатура ('KRP-KR', для шашек 'KK-MMM') -> позиции;
+    * структура пешек (для шашек - простых шашек) как пара битовых масок;
+    * (символ, клетка) -> позиции, для поиска по расположению фигур.
+
+    Номера позиций растут при добавлении, поэтому постинг-листы всегда
+    отсортированы, а новые партии добавляются без перестройки индексов.
+    """
+
+    def __init__(self, game='qwe'):
+        if game not in MATERIAL_ORDER:
+            raise ValueError(f"Неизвестная игра: {game}")
+        self.game = game
+        self.positions = []  # Строки по 64 символа
+        self.turns = bytearray()  # 0 - белые, 1 - черные
+        self.occurrences = array('I')
+        self.first_game = array('I')
+        self.games = 0
+        self.ids = {}  # (строка фигур, сторона на ходу) -> номер позиции
+        self.material_index = {}
+        self.pawn_index = {}
+        self.square_index = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _pawn_letter(self):
+        return 'M' if self.game == 'shashki' else 'P'
+
+    def pawn_structure(self, position):
+        """Битовые маски пешек (простых шашек) белых и черных"""
+        white = black = 0
+        letter = self._pawn_letter()
+        for (row, col), piece in position.pieces():
+            if _piece_letter(self.game, piece) == letter:
+                if piece.color == 'white':
+                    white |= 1 << (row * 8 + col)
+                else:
+                    black |= 1 << (row * 8 + col)
+        return white, black
+
+    @staticmethod
+    def _lookup(position):
+        """Ключ позиции в базе: строка из 64 символов и сторона на ходу"""
+        cells = [EMPTY] * 64
+        for (row, col), piece in position.pieces():
+            cells[row * 8 + col] = piece.symbol()
+        return ''.join(cells), 0 if position.turn == 'white' else 1
+
+    def find(self, position):
+        """Номер позиции в базе или None"""
+        return self.ids.get(self._lookup(position))
+
+    def add_position(self, position, game_id=0):
+        """Добавляет позицию; возвращает её номер"""
+        lookup = self._lookup(position)
+        position_id = self.ids.get(lookup)
+        if position_id is not None:
+            self.occurrences[position_id] += 1
+            return position_id
+
+        position_id = len(self.positions)
+        self.ids[lookup] = position_id
+        cells, turn = lookup
+        white, black = [], []
+        for (row, col), piece in position.pieces():
+            self.square_index.setdefault((piece.symbol(), row * 8 + col), array('I')).append(position_id)
+            (white if piece.color == 'white' else black).append(_piece_letter(self.game, piece))
+
+        self.positions.append(cells)
+        self.turns.append(turn)
+        self.occurrences.append(1)
+        self.first_game.append(game_id)
+        signature = normalize_material(self.game, ''.join(white), ''.join(black))
+        self.material_index.setdefault(signature, array('I')).append(position_id)
+        self.pawn_index.setdefault(self.pawn_structure(position), array('I')).append(position_id)
+        return position_id
+
+    def add_game(self, moves, start=None):
+        """Добавляет все позиции партии; ``moves`` - строки вида 'e2 e4'.
+
+        ``start`` - None для начальной расстановки или Snapshot.
+        Возвращает номер партии.
+        """
+        game_id = self.games
+        self.games += 1
+        position = Snapshot.initial(self.game) if start is None else start
+        self.add_position(position, game_id)
+        for move in moves:
+            position = position.play(parse_move(move))
+            self.add_position(position, game_id)
+        return game_id
+
+    def material(self, white, black):
+        """Позиции с заданным материалом, например material('KRP', 'KR')"""
+        return list(self.material_index.get(normalize_material(self.game, white, black), ()))
+
+    def same_pawns(self, position):
+        """Позиции с той же структурой пешек, что у ``position``"""
+        return list(self.pawn_index.get(self.pawn_structure(position), ()))
+
+    def pattern(self, squares):
+        """Позиции, где на клетках стоят заданные фигуры: {'e4': 'P', 'd5': 'p'}"""
+        return self.query(squares=squares)
+
+    def query(self, material=None, pawns=None, squares=None):
+        """Пересечение условий; ``material`` - пара (белые, черные)"""
+        postings = []
+        if material is not None:
+            postings.append(self.material_index.get(normalize_material(self.game, *material), array('I')))
+        if pawns is not None:
+            postings.append(self.pawn_index.get(self.pawn_structure(pawns), array('I')))
+        for name, symbol in (squares or {}).items():
+            postings.append(self.square_index.get((symbol, _square_index(name)), array('I')))
+        if not postings:
+            return list(range(len(self.positions)))
+
+        postings.sort(key=len)
+        result = list(postings[0])
+        for posting in postings[1:]:
+            if not result:
+                break
+            result = _intersect(result, posting)
+        return result
+
+    def snapshot(self, position_id):
+        """Восстанавливает снимок позиции (без истории для взятия на проходе)"""
+        table = _symbol_table(self.game)
+        cells = self.positions[position_id]
+        rows = []
+        for row in range(8):
+            pieces = []
+            for col in range(8):
+                symbol = cells[row * 8 + col]
+                if symbol == EMPTY:
+                    pieces.append(None)
+                    continue
+                cls, color, is_king = table[symbol]
+                if self.game == 'shashki':
+                    state = is_king
+                else:
+                    # Пешка вне начального ряда уже ходила
+                    state = cls.__name__ == 'Pawn' and row != (6 if color == 'white' else 1)
+                pieces.append(flyweight(cls, color, state))
+            rows.append(tuple(pieces))
+        return Snapshot(self.game, tuple(rows), 'black' if self.turns[position_id] else 'white')
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        database = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            database.__dict__.update(pickle.load(f))
+        return database
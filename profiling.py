@@ -0,0 +1,191 @@
+import json
+import time
+
+import hex
+import qwe
+import shashki
+
+
+# Горячие методы досок, которые инструментируются по умолчанию
+BOARD_HOT_METHODS = ('move_piece', 'undo_move', 'get_piece')
+# Горячие функции движка
+ENGINE_HOT_FUNCTIONS = ('evaluate',)
+
+
+def hot_paths(modules=(qwe, hex, shashki)):
+    """Возвращает список (класс или модуль, имя) горячих функций игр и движка"""
+    import engine  # engine сам импортирует profiling
+
+    paths = [(engine, name) for name in ENGINE_HOT_FUNCTIONS]
+    for module in modules:
+        for obj in vars(module).values():
+            if not isinstance(obj, type) or obj.__module__ != module.__name__:
+                continue
+            if issubclass(obj, module.Piece) and 'can_move' in vars(obj):
+                paths.append((obj, 'can_move'))
+            elif obj is module.Board:
+                for name in BOARD_HOT_METHODS:
+                    if name in vars(obj):
+                        paths.append((obj, name))
+    return paths
+
+
+class SearchStats:
+    """Счётчики перебора: узлы, отсечения и обращения к таблице транспозиций"""
+
+    def __init__(self):
+        self.nodes = 0
+        self.cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+
+    def tt_hit_rate(self):
+        """Доля попаданий в таблицу транспозиций"""
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def merge(self, other):
+        """Добавляет счётчики другого перебора"""
+        self.nodes += other.nodes
+        self.cutoffs += other.cutoffs
+        self.tt_probes += other.tt_probes
+        self.tt_hits += other.tt_hits
+
+    def as_dict(self):
+        return {
+            'nodes': self.nodes,
+            'cutoffs': self.cutoffs,
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_hit_rate': self.tt_hit_rate(),
+        }
+
+
+class Profiler:
+    """Включаемая инструментация горячих функций.
+
+    Пока профилировщик не запущен, классы игр не изменяются, поэтому
+    в обычном режиме накладных расходов нет. При запуске методы из
+    ``targets`` подменяются обёртками, считающими вызовы и время, а при
+    остановке оригиналы возвращаются на место. Engine.search добавляет
+    свои счётчики в запущенный профилировщик (``Profiler.active``).
+    """
+
+    active = None  # Запущенный профилировщик, которому движок отдаёт SearchStats
+
+    def __init__(self, targets=None):
+        self.targets = list(targets) if targets is not None else hot_paths()
+        self.calls = {}  # имя -> [число вызовов, общее время, собственное время]
+        self.stacks = {}  # стек вызовов -> собственное время
+        self.search = SearchStats()
+        self._originals = []
+        self._stack = []
+        self._child_time = []
+        self._started = None
+        self.wall_time = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        """Подменяет горячие методы обёртками"""
+        if self._originals:
+            return
+        for owner, name in self.targets:
+            original = vars(owner)[name]
+            if isinstance(owner, type):
+                qualname = f"{owner.__module__}.{owner.__name__}.{name}"
+            else:
+                qualname = f"{owner.__name__}.{name}"
+            setattr(owner, name, self._wrap(qualname, original))
+            self._originals.append((owner, name, original))
+        self._started = time.perf_counter()
+        Profiler.active = self
+
+    def stop(self):
+        """Возвращает оригинальные методы"""
+        for owner, name, original in reversed(self._originals):
+            setattr(owner, name, original)
+        self._originals = []
+        if Profiler.active is self:
+            Profiler.active = None
+        if self._started is not None:
+            self.wall_time += time.perf_counter() - self._started
+            self._started = None
+
+    def _wrap(self, qualname, func):
+        """Создаёт обёртку, считающую вызовы и время"""
+        record = self.calls.setdefault(qualname, [0, 0.0, 0.0])
+        stack = self._stack
+        child_time = self._child_time
+        stacks = self.stacks
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            stack.append(qualname)
+            child_time.append(0.0)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                own = elapsed - child_time.pop()
+                key = tuple(stack)
+                stack.pop()
+                if child_time:
+                    child_time[-1] += elapsed
+                record[0] += 1
+                record[1] += elapsed
+                record[2] += own
+                stacks[key] = stacks.get(key, 0.0) + own
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def record_search(self, stats):
+        """Добавляет в отчёт счётчики завершённого перебора"""
+        self.search.merge(stats)
+
+    def report(self):
+        """Возвращает отчёт в виде словаря"""
+        functions = {}
+        for name, (calls, total, own) in sorted(self.calls.items(), key=lambda item: -item[1][1]):
+            if not calls:
+                continue
+            functions[name] = {
+                'calls': calls,
+                'total_time': total,
+                'self_time': own,
+                'avg_time': total / calls,
+            }
+        return {
+            'wall_time': self.wall_time,
+            'functions': functions,
+            'search': self.search.as_dict(),
+        }
+
+    def write_json(self, path):
+        """Сохраняет отчёт в JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+
+    def collapsed_stacks(self):
+        """Строки в формате collapsed stacks (flamegraph.pl, speedscope)"""
+        lines = []
+        for stack, own in sorted(self.stacks.items()):
+            micros = int(own * 1_000_000)
+            if micros > 0:
+                lines.append(f"{';'.join(stack)} {micros}")
+        return lines
+
+    def write_collapsed(self, path):
+        """Сохраняет стеки для построения flamegraph"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in self.collapsed_stacks():
+                f.write(line + '\n')
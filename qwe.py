@@ -1,10 +1,31 @@
+import random
+from array import array
+
+
+# Ключи Зобриста: символ фигуры -> ключ для каждой из 64 клеток
+_zobrist_rng = random.Random(20240501)
+ZOBRIST_PIECES = {symbol: [_zobrist_rng.getrandbits(64) for _ in range(64)] for symbol in 'PNBRQKpnbrqk'}
+ZOBRIST_BLACK_TO_MOVE = _zobrist_rng.getrandbits(64)
+ZOBRIST_EN_PASSANT = [_zobrist_rng.getrandbits(64) for _ in range(8)]
+
+
 class Piece:
     """Базовый класс для шахматных фигур"""
 
+    shared = False  # Общий экземпляр из шаблона доски (см. factory.py)
+
     def __init__(self, color):
         self.color = color  # 'white' или 'black'
         self.has_moved = False
 
+    def unshare(self):
+        """Собственная копия общей фигуры перед изменением (copy-on-write)"""
+        if not self.shared:
+            return self
+        piece = type(self)(self.color)
+        piece.has_moved = self.has_moved
+        return piece
+
     def symbol(self):
         """Возвращает символ фигуры"""
         raise NotImplementedError
@@ -66,6 +87,7 @@ class Pawn(Piece):
 
             if (isinstance(adjacent_piece, Pawn) and adjacent_piece.color != self.color and
                     board.last_move and board.last_move.piece == adjacent_piece and
+                    board.last_move.end_pos == adjacent_pos and
                     abs(board.last_move.start_pos[0] - board.last_move.end_pos[0]) == 2):
                 return True
 
@@ -192,11 +214,20 @@ class Move:
 class Board:
     """Шахматная доска с историей ходов"""
 
+    EMPTY = '.'  # Символ пустой клетки
+
     def __init__(self):
         self.grid = [[None for _ in range(8)] for _ in range(8)]
         self.move_history = []
         self.last_move = None  # Последний ход для взятия на проходе
+        self.black_to_move = False  # Доска может начинаться не с хода белых (см. reset_history)
         self.setup_board()
+        # После каждого хода (индекс 0 - до первого хода) храним ключ позиции,
+        # полуходы без взятий и ходов пешек (правило 50 ходов) и полуходы,
+        # с которых позиция может повториться (их сбрасывает и потеря права рокировки)
+        self.position_keys = array('Q', [self.compute_key()])
+        self.halfmove_clocks = array('H', [0])
+        self.repetition_windows = array('H', [0])
 
     def setup_board(self):
         """Начальная расстановка фигур"""
@@ -243,6 +274,7 @@ class Board:
         piece = self.get_piece(start_pos)
         if not piece:
             return False
+        piece = self.grid[start_pos[0]][start_pos[1]] = piece.unshare()
 
         # Проверяем превращение пешки
         promotion = None
@@ -266,6 +298,13 @@ class Board:
 
         move = Move(piece, start_pos, end_pos, captured_piece, promotion, en_passant)
 
+        # Правило 50 ходов сбрасывают только взятие и ход пешки, а прежние
+        # позиции становятся неповторимыми ещё и после первого хода короля/ладьи
+        resets_clock = captured_piece is not None or isinstance(piece, Pawn)
+        irreversible = resets_clock or (isinstance(piece, (King, Rook)) and not piece.has_moved)
+        touched = {start_pos, end_pos, (start_pos[0], end_pos[1])}
+        key = self.position_keys[-1] ^ self._square_keys(touched) ^ self._en_passant_key()
+
         # Выполняем ход
         start_row, start_col = start_pos
         end_row, end_col = end_pos
@@ -287,6 +326,12 @@ class Board:
         piece.update_position()
         self.move_history.append(move)
         self.last_move = move
+        self.black_to_move = not self.black_to_move
+
+        key ^= self._square_keys(touched) ^ self._en_passant_key() ^ ZOBRIST_BLACK_TO_MOVE
+        self.position_keys.append(key)
+        self.halfmove_clocks.append(0 if resets_clock else min(self.halfmove_clocks[-1] + 1, 0xFFFF))
+        self.repetition_windows.append(0 if irreversible else min(self.repetition_windows[-1] + 1, 0xFFFF))
 
         return True
 
@@ -297,6 +342,10 @@ class Board:
                 return False
 
             last_move = self.move_history.pop()
+            self.position_keys.pop()
+            self.halfmove_clocks.pop()
+            self.repetition_windows.pop()
+            self.black_to_move = not self.black_to_move
 
             # Возвращаем фигуру на место
             start_row, start_col = last_move.start_pos
@@ -327,6 +376,77 @@ class Board:
 
         return True
 
+    def compute_key(self):
+        """Полностью вычисляет ключ Зобриста текущей позиции"""
+        key = self._square_keys((row, col) for row in range(8) for col in range(8))
+        key ^= self._en_passant_key()
+        if self.black_to_move:
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        return key
+
+    def reset_history(self, black_to_move=False):
+        """Начинает историю повторений с текущей расстановки.
+
+        Нужна доскам, собранным не ходами (например, Snapshot.to_board):
+        ключ и счётчики описывают позицию на доске, а не начальную.
+        """
+        self.move_history = []
+        self.black_to_move = black_to_move
+        self.position_keys = array('Q', [self.compute_key()])
+        self.halfmove_clocks = array('H', [0])
+        self.repetition_windows = array('H', [0])
+
+    def _square_keys(self, squares):
+        """XOR ключей фигур на указанных клетках"""
+        key = 0
+        for row, col in squares:
+            if 0 <= row < 8 and 0 <= col < 8:
+                piece = self.grid[row][col]
+                if piece is not None:
+                    key ^= ZOBRIST_PIECES[piece.symbol()][row * 8 + col]
+        return key
+
+    def _en_passant_key(self):
+        """Ключ колонки, где возможно взятие на проходе"""
+        move = self.last_move
+        if move and isinstance(move.piece, Pawn) and abs(move.start_pos[0] - move.end_pos[0]) == 2:
+            return ZOBRIST_EN_PASSANT[move.end_pos[1]]
+        return 0
+
+    @property
+    def position_key(self):
+        """Ключ текущей позиции"""
+        return self.position_keys[-1]
+
+    @property
+    def halfmove_clock(self):
+        """Число полуходов после последнего взятия или хода пешки"""
+        return self.halfmove_clocks[-1]
+
+    def repetition_count(self):
+        """Сколько раз текущая позиция встречалась с последнего необратимого хода.
+
+        Просматриваются только позиции с той же стороной на ходу после
+        последнего взятия, хода пешки или потери права рокировки, поэтому
+        проверка стоит O(repetition_windows[-1]), а не O(длины партии).
+        """
+        keys = self.position_keys
+        current = len(keys) - 1
+        oldest = max(0, current - self.repetition_windows[current])
+        count = 1
+        for index in range(current - 2, oldest - 1, -2):
+            if keys[index] == keys[current]:
+                count += 1
+        return count
+
+    def is_repetition(self, times=3):
+        """Проверяет повторение позиции указанное число раз"""
+        return self.repetition_count() >= times
+
+    def is_fifty_move_draw(self):
+        """Правило 50 ходов: 100 полуходов без взятий и ходов пешек"""
+        return self.halfmove_clock >= 100
+
     def parse_position(self, pos_str):
         """Преобразует строку в координаты (ряд, колонка)"""
         if len(pos_str) != 2:
@@ -337,24 +457,53 @@ class Board:
             return (row, col)
         return None
 
+    def render(self):
+        """Возвращает изображение доски одной строкой"""
+        lines = ["  a b c d e f g h"]
+        for row in range(8):
+            cells = ''.join(f"{piece.symbol() if piece else self.EMPTY} " for piece in self.grid[row])
+            lines.append(f"{8 - row} {cells}{8 - row}")
+        lines.append("  a b c d e f g h")
+        return '\n'.join(lines)
+
     def display(self):
         """Отображает доску"""
-        print("  a b c d e f g h")
-        for row in range(8):
-            print(f"{8 - row} ", end="")
-            for col in range(8):
-                piece = self.grid[row][col]
-                print(piece.symbol() if piece else '.', end=" ")
-            print(f"{8 - row}")
-        print("  a b c d e f g h")
+        print(self.render())
 
 
 class ChessGame:
     """Управление игровым процессом"""
 
-    def __init__(self):
+    def __init__(self, engine=None, engine_color='black'):
         self.board = Board()
         self.current_player = 'white'
+        self.engine = engine  # Необязательный движок (см. engine.py)
+        self.engine_color = engine_color
+
+    def engine_move(self):
+        """Ход движка; возвращает False, если ходов нет"""
+        move = self.engine.choose_move(self.board, self.current_player)
+        if move is None:
+            return False
+        print(f"Ход движка: {move}")
+        tokens = move.split()
+        promotion_choice = tokens[2] if len(tokens) > 2 else None
+        self.board.move_piece(self.board.parse_position(tokens[0]), self.board.parse_position(tokens[1]),
+                              promotion_choice)
+        self.current_player = 'black' if self.current_player == 'white' else 'white'
+        return True
+
+    def check_draw(self):
+        """Сообщает о ничьей по повторению или правилу 50 ходов"""
+        if self.board.is_repetition():
+            self.board.display()
+            print("Ничья: позиция повторилась трижды")
+            return True
+        if self.board.is_fifty_move_draw():
+            self.board.display()
+            print("Ничья по правилу 50 ходов")
+            return True
+        return False
 
     def play(self):
         """Основной игровой цикл"""
@@ -367,13 +516,26 @@ class ChessGame:
             print(f"\nХод {'белых' if self.current_player == 'white' else 'черных'}")
             print(f"Сделано ходов: {len(self.board.move_history)}")
 
+            if self.engine and self.current_player == self.engine_color:
+                if not self.engine_move():
+                    print("У движка нет ходов")
+                    break
+                if self.check_draw():
+                    break
+                continue
+
+            # Пока человек думает, движок перебирает его вероятные ходы
+            if self.engine:
+                self.engine.start_pondering(self.board, self.current_player)
             command = input("Введите ход или команду: ").strip().lower()
+            if self.engine:
+                self.engine.stop_pondering()
 
             if command.startswith('undo'):
                 try:
                     num = int(command.split()[1]) if len(command.split()) > 1 else 1
                     if self.board.undo_move(num):
-                        self.current_player = 'white' if len(self.board.move_history) % 2 == 0 else 'black'
+                        self.current_player = 'black' if self.board.black_to_move else 'white'
                         print(f"Откатили {num} ход(ов)")
                     else:
                         print("Нельзя откатить - история пуста")
@@ -433,6 +595,9 @@ class ChessGame:
             if self.board.move_piece(start_pos, end_pos, promotion_choice):
                 self.current_player = 'black' if self.current_player == 'white' else 'white'
 
+            if self.check_draw():
+                break
+
 
 if __name__ == "__main__":
     game = ChessGame()
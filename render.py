@@ -0,0 +1,219 @@
+import contextlib
+import io
+import random
+import sys
+import time
+
+from snapshot import GAMES, Snapshot
+
+
+CLEAR_SCREEN = '\x1b[2J'
+FILES = 'a b c d e f g h'
+
+# Размер плитки одной доски: заголовок, буквы, 8 рядов, буквы и отступ
+TILE_HEIGHT = 12
+TILE_WIDTH = 22
+
+
+def _goto(row, col):
+    """ANSI-последовательность перемещения курсора (нумерация с 1)"""
+    return f"\x1b[{row};{col}H"
+
+
+def board_cells(board):
+    """Символы 64 клеток доски по рядам"""
+    empty = getattr(board, 'EMPTY', '.')
+    return [piece.symbol() if piece else empty for row in board.grid for piece in row]
+
+
+class BoardView:
+    """Плитка одной доски на экране: помнит, что было нарисовано в прошлый раз"""
+
+    def __init__(self, board, top, left, title=''):
+        self.board = board
+        self.top = top
+        self.left = left
+        self.title = title
+        self.last_cells = None
+
+    def full(self, parts):
+        """Рисует плитку целиком"""
+        cells = board_cells(self.board)
+        parts.append(_goto(self.top, self.left) + self.title[:TILE_WIDTH - 1])
+        parts.append(_goto(self.top + 1, self.left) + '  ' + FILES)
+        for row in range(8):
+            line = ' '.join(cells[row * 8:row * 8 + 8])
+            parts.append(f"{_goto(self.top + 2 + row, self.left)}{8 - row} {line} {8 - row}")
+        parts.append(_goto(self.top + 10, self.left) + '  ' + FILES)
+        self.last_cells = cells
+
+    def diff(self, parts):
+        """Перерисовывает только изменившиеся клетки; возвращает их число"""
+        if self.last_cells is None:
+            self.full(parts)
+            return 64
+        cells = board_cells(self.board)
+        last = self.last_cells
+        changed = 0
+        for square in range(64):
+            if cells[square] != last[square]:
+                row, col = divmod(square, 8)
+                parts.append(_goto(self.top + 2 + row, self.left + 2 + 2 * col) + cells[square])
+                changed += 1
+        self.last_cells = cells
+        return changed
+
+
+class Renderer:
+    """Выводит много досок в одну плиточную картинку.
+
+    Каждый кадр собирается в одну строку и записывается в поток одним
+    вызовом ``write``; после первого кадра перерисовываются только
+    клетки, изменившиеся с прошлого кадра, с помощью ANSI-адресации курсора.
+    """
+
+    def __init__(self, stream=None, columns=4):
+        self.stream = stream if stream is not None else sys.stdout
+        self.columns = columns
+        self.views = []
+        self.needs_full = True
+
+    def add(self, board, title=''):
+        """Добавляет доску в следующую свободную плитку"""
+        index = len(self.views)
+        row, col = divmod(index, self.columns)
+        view = BoardView(board, 1 + row * TILE_HEIGHT, 1 + col * TILE_WIDTH, title)
+        self.views.append(view)
+        self.needs_full = True
+        return view
+
+    def remove(self, board):
+        """Убирает доску; остальные плитки перерисовываются целиком"""
+        self.views = [view for view in self.views if view.board is not board]
+        for index, view in enumerate(self.views):
+            row, col = divmod(index, self.columns)
+            view.top, view.left = 1 + row * TILE_HEIGHT, 1 + col * TILE_WIDTH
+        self.needs_full = True
+
+    def invalidate(self):
+        """Следующий кадр будет нарисован целиком (например, после resize)"""
+        self.needs_full = True
+
+    def frame(self):
+        """Собирает следующий кадр в строку"""
+        parts = []
+        if self.needs_full:
+            parts.append(CLEAR_SCREEN)
+            for view in self.views:
+                view.full(parts)
+            self.needs_full = False
+        else:
+            for view in self.views:
+                view.diff(parts)
+        rows = (len(self.views) + self.columns - 1) // self.columns
+        parts.append(_goto(rows * TILE_HEIGHT + 1, 1))
+        return ''.join(parts)
+
+    def draw(self):
+        """Выводит кадр одним вызовом write"""
+        self.stream.write(self.frame())
+        self.stream.flush()
+
+
+class _CountingSink(io.TextIOBase):
+    """Поток, который только считает записи и символы"""
+
+    def __init__(self):
+        self.writes = 0
+        self.chars = 0
+
+    def write(self, text):
+        self.writes += 1
+        self.chars += len(text)
+        return len(text)
+
+
+def per_cell_display(board):
+    """Прежний способ вывода: отдельный print на каждую клетку"""
+    print("  " + FILES)
+    for row in range(8):
+        print(f"{8 - row} ", end="")
+        for col in range(8):
+            piece = board.grid[row][col]
+            print(piece.symbol() if piece else board.EMPTY, end=" ")
+        print(f"{8 - row}")
+    print("  " + FILES)
+
+
+def _timed_display(display, live, history):
+    """Время и число записей при выводе каждой доски своим display"""
+    sink = _CountingSink()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        for grids in history:
+            for board, grid in zip(live, grids):
+                board.grid = grid
+                display(board)
+    return time.perf_counter() - start, sink
+
+
+def _random_frames(game, boards, frames, seed):
+    """Заранее проигрывает случайные партии: сетка каждой доски в каждом кадре"""
+    rng = random.Random(seed)
+    positions = [Snapshot.initial(game) for _ in range(boards)]
+    history = []
+    for _ in range(frames):
+        grids = []
+        for index, position in enumerate(positions):
+            moves = position.moves()
+            if position.winner(moves) is not None:
+                position = Snapshot.initial(game)
+                moves = position.moves()
+            positions[index] = position = position.play(rng.choice(moves))
+            grids.append(position.to_board().grid)
+        history.append(grids)
+    return history
+
+
+def benchmark(game='qwe', boards=24, frames=50, seed=0):
+    """Сравнивает время кадра на одних и тех же партиях.
+
+    Сравниваются вывод по клеткам (как раньше работал display()),
+    текущий display() и Renderer с перерисовкой только изменений.
+    """
+    history = _random_frames(game, boards, frames, seed)
+    live = [GAMES[game].Board() for _ in range(boards)]
+
+    per_cell, per_cell_sink = _timed_display(per_cell_display, live, history)
+    legacy, legacy_sink = _timed_display(lambda board: board.display(), live, history)
+
+    sink = _CountingSink()
+    renderer = Renderer(sink, columns=6)
+    for index, board in enumerate(live):
+        renderer.add(board, f"{game} #{index + 1}")
+    start = time.perf_counter()
+    for grids in history:
+        for board, grid in zip(live, grids):
+            board.grid = grid
+        renderer.draw()
+    buffered = time.perf_counter() - start
+
+    return {
+        'boards': boards,
+        'frames': frames,
+        'per_cell_frame_ms': per_cell / frames * 1000,
+        'per_cell_writes_per_frame': per_cell_sink.writes / frames,
+        'display_frame_ms': legacy / frames * 1000,
+        'display_writes_per_frame': legacy_sink.writes / frames,
+        'display_chars_per_frame': legacy_sink.chars / frames,
+        'renderer_frame_ms': buffered / frames * 1000,
+        'renderer_writes_per_frame': sink.writes / frames,
+        'renderer_chars_per_frame': sink.chars / frames,
+        'speedup_vs_per_cell': per_cell / buffered if buffered else float('inf'),
+        'speedup_vs_display': legacy / buffered if buffered else float('inf'),
+    }
+
+
+if __name__ == "__main__":
+    for name in ('qwe', 'hex', 'shashki'):
+        print(name, benchmark(name))
@@ -1,6 +1,8 @@
 class Piece:
     """Базовый класс для всех игровых фигур"""
 
+    shared = False  # Общий экземпляр из шаблона доски (см. factory.py)
+
     def __init__(self, color):
         self.color = color  # 'white' или 'black'
 
@@ -20,6 +22,14 @@ class Checker(Piece):
         super().__init__(color)
         self.is_king = False  # Флаг дамки
 
+    def unshare(self):
+        """Собственная копия общей шашки перед изменением (copy-on-write)"""
+        if not self.shared:
+            return self
+        piece = Checker(self.color)
+        piece.is_king = self.is_king
+        return piece
+
     def symbol(self):
         if self.is_king:
             return '★' if self.color == 'white' else '☆'
@@ -60,6 +70,8 @@ class Checker(Piece):
 class Board:
     """Класс игровой доски"""
 
+    EMPTY = '·'  # Символ пустой клетки
+
     def __init__(self):
         self.grid = [[None for _ in range(8)] for _ in range(8)]
         self.setup_board()
@@ -82,18 +94,19 @@ class Board:
         row, col = pos
         return self.grid[row][col]
 
+    def render(self):
+        """Возвращает изображение доски одной строкой"""
+        lines = ["   a b c d e f g h", "  +-----------------+"]
+        for row in range(8):
+            cells = ''.join(f"{piece.symbol() if piece else self.EMPTY} " for piece in self.grid[row])
+            lines.append(f"{8 - row} |{cells}| {8 - row}")
+        lines.append("  +-----------------+")
+        lines.append("   a b c d e f g h")
+        return '\n'.join(lines)
+
     def display(self):
         """Отображает доску в консоли"""
-        print("   a b c d e f g h")
-        print("  +-----------------+")
-        for row in range(8):
-            print(f"{8 - row} |", end="")
-            for col in range(8):
-                piece = self.grid[row][col]
-                print(piece.symbol() if piece else '·', end=" ")
-            print(f"| {8 - row}")
-        print("  +-----------------+")
-        print("   a b c d e f g h")
+        print(self.render())
 
     def move_piece(self, start, end):
         """Выполняет ход шашки"""
@@ -113,24 +126,70 @@ class Board:
             print("Невозможно выполнить такой ход!")
             return False
 
-        # Выполняем ход
+        captured_pos, crowned = self.make_move(start_pos, end_pos)
+        if captured_pos:
+            middle_row, middle_col = captured_pos
+            print(f"Шашка на {chr(middle_col + ord('a'))}{8 - middle_row} взята!")
+        if crowned:
+            print("Шашка стала дамкой!")
+        return True
+
+    def make_move(self, start_pos, end_pos):
+        """Выполняет уже проверенный ход без вывода в консоль.
+
+        Возвращает позицию взятой шашки (или None) и признак того,
+        что шашка дошла до последнего ряда.
+        """
+        piece = self.get_piece(start_pos)
         self.grid[end_pos[0]][end_pos[1]] = piece
         self.grid[start_pos[0]][start_pos[1]] = None
 
         # Если это было взятие - удаляем побитую шашку
+        captured_pos = None
         if abs(end_pos[0] - start_pos[0]) == 2:
-            middle_row = (start_pos[0] + end_pos[0]) // 2
-            middle_col = (start_pos[1] + end_pos[1]) // 2
-            self.grid[middle_row][middle_col] = None
-            print(f"Шашка на {chr(middle_col + ord('a'))}{8 - middle_row} взята!")
+            captured_pos = ((start_pos[0] + end_pos[0]) // 2, (start_pos[1] + end_pos[1]) // 2)
+            self.grid[captured_pos[0]][captured_pos[1]] = None
 
         # Проверяем, стала ли шашка дамкой
-        if (piece.color == 'white' and end_pos[0] == 0) or (piece.color == 'black' and end_pos[0] == 7):
+        crowned = (piece.color == 'white' and end_pos[0] == 0) or (piece.color == 'black' and end_pos[0] == 7)
+        if crowned and not piece.is_king:
+            piece = self.grid[end_pos[0]][end_pos[1]] = piece.unshare()
             piece.is_king = True
-            print("Шашка стала дамкой!")
 
         self.move_count += 1
-        return True
+        return captured_pos, crowned
+
+    def can_capture_again(self, pos):
+        """Проверяет, может ли шашка на данной позиции взять еще одну шашку"""
+        piece = self.get_piece(pos)
+        if not piece:
+            return False
+
+        row, col = pos
+        directions = []
+
+        # Для обычной шашки
+        if not piece.is_king:
+            directions = [(-1, -1), (-1, 1)] if piece.color == 'white' else [(1, -1), (1, 1)]
+        else:  # Для дамки
+            directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+        for dr, dc in directions:
+            # Проверяем возможность взятия в каждом направлении
+            jump_row = row + 2 * dr
+            jump_col = col + 2 * dc
+
+            if 0 <= jump_row < 8 and 0 <= jump_col < 8:
+                middle_row = row + dr
+                middle_col = col + dc
+                middle_piece = self.get_piece((middle_row, middle_col))
+
+                if (middle_piece is not None and
+                        middle_piece.color != piece.color and
+                        self.get_piece((jump_row, jump_col)) is None):
+                    return True
+
+        return False
 
     def parse_position(self, pos_str):
         """Преобразует строку типа 'a3' в координаты (ряд, колонка)"""
@@ -153,9 +212,11 @@ class Board:
 class CheckersGame:
     """Класс управления игрой"""
 
-    def __init__(self):
+    def __init__(self, engine=None, engine_color='black'):
         self.board = Board()
         self.current_player = 'white'
+        self.engine = engine  # Необязательный движок (см. engine.py)
+        self.engine_color = engine_color
 
     def play(self):
         """Основной игровой цикл"""
@@ -167,7 +228,21 @@ class CheckersGame:
             self.board.display()
             print(f"\nХод {'белых' if self.current_player == 'white' else 'черных'} (ход №{self.board.move_count + 1})")
 
-            move = input("Введите ход (например, 'a3 b4'): ").strip().lower().split()
+            if self.engine and self.current_player == self.engine_color:
+                engine_move = self.engine.choose_move(self.board, self.current_player)
+                if engine_move is None:
+                    print("У движка нет ходов")
+                    break
+                print(f"Ход движка: {engine_move}")
+                move = engine_move.split()
+            else:
+                # Пока человек думает, движок перебирает его вероятные ходы
+                if self.engine:
+                    self.engine.start_pondering(self.board, self.current_player)
+                move = input("Введите ход (например, 'a3 b4'): ").strip().lower().split()
+                if self.engine:
+                    self.engine.stop_pondering()
+
             if len(move) != 2:
                 print("Ошибка: нужно ввести две позиции, например 'a3 b4'")
                 continue
@@ -187,35 +262,7 @@ class CheckersGame:
 
     def can_capture_again(self, pos):
         """Проверяет, может ли шашка на данной позиции взять еще одну шашку"""
-        piece = self.board.get_piece(pos)
-        if not piece:
-            return False
-
-        row, col = pos
-        directions = []
-
-        # Для обычной шашки
-        if not piece.is_king:
-            directions = [(-1, -1), (-1, 1)] if piece.color == 'white' else [(1, -1), (1, 1)]
-        else:  # Для дамки
-            directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-
-        for dr, dc in directions:
-            # Проверяем возможность взятия в каждом направлении
-            jump_row = row + 2 * dr
-            jump_col = col + 2 * dc
-
-            if 0 <= jump_row < 8 and 0 <= jump_col < 8:
-                middle_row = row + dr
-                middle_col = col + dc
-                middle_piece = self.board.get_piece((middle_row, middle_col))
-
-                if (middle_piece is not None and
-                        middle_piece.color != piece.color and
-                        self.board.get_piece((jump_row, jump_col)) is None):
-                    return True
-
-        return False
+        return self.board.can_capture_again(pos)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,283 @@
+import random
+
+import factory
+import qwe
+import shashki
+from factory import GAMES, piece_state
+
+
+PROMOTIONS = ('q', 'r', 'b', 'n')
+
+_side_key = random.Random('snapshot:black').getrandbits(64)
+_en_passant_keys = [random.Random(f"snapshot:ep:{col}").getrandbits(64) for col in range(8)]
+
+
+def flyweight(cls, color, state=False):
+    """Возвращает общий неизменяемый экземпляр фигуры.
+
+    Для каждого сочетания класса, цвета и состояния (has_moved или
+    is_king) создаётся ровно один объект (factory.flyweight), который
+    разделяют все снимки и доски из шаблона. Снимок добавляет к нему
+    ключи Зобриста по клеткам.
+    """
+    piece = factory.flyweight(cls, color, state)
+    if 'zobrist' not in piece.__dict__:
+        seed = f"{cls.__module__}:{cls.__name__}:{color}:{state}"
+        piece.zobrist = tuple(random.Random(f"{seed}:{square}").getrandbits(64) for square in range(64))
+    return piece
+
+
+def _shared(piece):
+    """Флайвейт для фигуры с доски"""
+    return flyweight(type(piece), piece.color, piece_state(piece))
+
+
+def _replace(rows, changes):
+    """Новая сетка, где заменены только затронутые ряды"""
+    new_rows = list(rows)
+    for (row, col), piece in changes.items():
+        cells = list(new_rows[row])
+        cells[col] = piece
+        new_rows[row] = cells
+    return tuple(tuple(cells) if isinstance(cells, list) else cells for cells in new_rows)
+
+
+def opponent(color):
+    """Цвет соперника"""
+    return 'black' if color == 'white' else 'white'
+
+
+class Snapshot:
+    """Неизменяемая позиция qwe, hex или shashki.
+
+    Сетка хранится как кортеж из 8 кортежей-рядов с общими фигурами-флайвейтами,
+    поэтому ход копирует только изменённые ряды, а остальные разделяются со
+    снимком-родителем. У снимка есть ``grid`` и ``get_piece``, так что
+    ``can_move`` фигур работает с ним так же, как с доской.
+    """
+
+    __slots__ = ('game', 'grid', 'turn', 'last_move', 'key')
+
+    def __init__(self, game, grid, turn='white', last_move=None, key=None):
+        self.game = game
+        self.grid = grid
+        self.turn = turn
+        self.last_move = last_move  # Нужен qwe для взятия на проходе
+        self.key = self._compute_key() if key is None else key
+
+    @classmethod
+    def from_board(cls, board, turn='white'):
+        """Снимок текущей позиции доски"""
+        game = type(board).__module__
+        if game not in GAMES:
+            raise ValueError(f"Неизвестный тип доски: {type(board).__name__}")
+
+        grid = tuple(
+            tuple(_shared(piece) if piece else None for piece in row)
+            for row in board.grid
+        )
+        last_move = None
+        move = getattr(board, 'last_move', None)
+        if move is not None:
+            piece = grid[move.end_pos[0]][move.end_pos[1]]
+            last_move = qwe.Move(piece, move.start_pos, move.end_pos)
+        return cls(game, grid, turn, last_move)
+
+    @classmethod
+    def initial(cls, game):
+        """Снимок начальной расстановки"""
+        return cls.from_board(factory.new_board(game))
+
+    def to_board(self):
+        """Создаёт обычную доску из шаблона игры.
+
+        Фигуры снимка ставятся на доску как есть: они общие, и доска
+        заменяет их собственными копиями при первом изменении (unshare).
+        """
+        board = factory.new_board(self.game)
+        board.grid = [list(row) for row in self.grid]
+        if self.last_move is not None and hasattr(board, 'last_move'):
+            end_row, end_col = self.last_move.end_pos
+            board.last_move = qwe.Move(board.grid[end_row][end_col], self.last_move.start_pos, self.last_move.end_pos)
+        if self.game == 'qwe':
+            board.reset_history(self.turn == 'black')
+        return board
+
+    def _en_passant_col(self):
+        """Колонка пешки, только что сделавшей двойной ход (или None)"""
+        move = self.last_move
+        if (move is not None and isinstance(move.piece, qwe.Pawn) and
+                abs(move.start_pos[0] - move.end_pos[0]) == 2):
+            return move.end_pos[1]
+        return None
+
+    def _compute_key(self):
+        key = _side_key if self.turn == 'black' else 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.grid[row][col]
+                if piece is not None:
+                    key ^= piece.zobrist[row * 8 + col]
+        en_passant_col = self._en_passant_col()
+        if en_passant_col is not None:
+            key ^= _en_passant_keys[en_passant_col]
+        return key
+
+    def __eq__(self, other):
+        return (isinstance(other, Snapshot) and self.key == other.key and
+                self.game == other.game and self.turn == other.turn and
+                self.grid == other.grid and self._en_passant_col() == other._en_passant_col())
+
+    def __hash__(self):
+        return self.key
+
+    def __reduce__(self):
+        # Фигуры передаются описаниями, чтобы в другом процессе снова стать флайвейтами
+        cells = tuple(
+            (type(piece), piece.color, piece_state(piece)) if piece else None
+            for row in self.grid for piece in row
+        )
+        last_move = (self.last_move.start_pos, self.last_move.end_pos) if self.last_move else None
+        return _restore, (self.game, cells, self.turn, last_move, self.key)
+
+    def __repr__(self):
+        return f"Snapshot({self.game!r}, turn={self.turn!r}, key={self.key:016x})"
+
+    def get_piece(self, pos):
+        """Возвращает фигуру по позиции"""
+        row, col = pos
+        if 0 <= row < 8 and 0 <= col < 8:
+            return self.grid[row][col]
+        return None
+
+    def pieces(self, color=None):
+        """Перечисляет (позиция, фигура), при необходимости только одного цвета"""
+        for row in range(8):
+            for col in range(8):
+                piece = self.grid[row][col]
+                if piece is not None and (color is None or piece.color == color):
+                    yield (row, col), piece
+
+    def moves(self):
+        """Ходы стороны, которая ходит.
+
+        Ход - кортеж (start_pos, end_pos) или (start_pos, end_pos, превращение).
+        Ходы на клетки со своими фигурами не порождаются.
+        """
+        moves = []
+        for start_pos, piece in self.pieces(self.turn):
+            if self.game == 'shashki':
+                targets = [(start_pos[0] + dr, start_pos[1] + dc)
+                           for dr in (-2, -1, 1, 2) for dc in (-abs(dr), abs(dr))]
+            else:
+                targets = [(row, col) for row in range(8) for col in range(8)]
+
+            for end_pos in targets:
+                if not (0 <= end_pos[0] < 8 and 0 <= end_pos[1] < 8) or end_pos == start_pos:
+                    continue
+                target = self.grid[end_pos[0]][end_pos[1]]
+                if target is not None and target.color == piece.color:
+                    continue
+                if not piece.can_move(self, start_pos, end_pos):
+                    continue
+                if self.game == 'qwe' and isinstance(piece, qwe.Pawn) and end_pos[0] in (0, 7):
+                    moves.extend((start_pos, end_pos, promotion) for promotion in PROMOTIONS)
+                else:
+                    moves.append((start_pos, end_pos))
+        return moves
+
+    def winner(self, moves=None):
+        """Цвет победителя, если партия окончена, иначе None.
+
+        Можно передать уже построенный список ``moves()``, чтобы не
+        порождать ходы повторно.
+        """
+        if moves is None:
+            moves = self.moves()
+        if self.game != 'shashki':
+            kings = {piece.color for _, piece in self.pieces() if isinstance(piece, GAMES[self.game].King)}
+            if len(kings) == 1:
+                return kings.pop()
+        if not moves:
+            return opponent(self.turn)
+        return None
+
+    def play(self, move):
+        """Возвращает новый снимок после хода; сам снимок не меняется"""
+        start_pos, end_pos = move[0], move[1]
+        piece = self.grid[start_pos[0]][start_pos[1]]
+        if piece is None:
+            raise ValueError(f"На клетке {start_pos} нет фигуры")
+
+        changes = {start_pos: None}
+        last_move = None
+        turn = opponent(self.turn)
+
+        if self.game == 'shashki':
+            captured_pos = None
+            if abs(end_pos[0] - start_pos[0]) == 2:
+                captured_pos = ((start_pos[0] + end_pos[0]) // 2, (start_pos[1] + end_pos[1]) // 2)
+                changes[captured_pos] = None
+            crowned = (piece.color == 'white' and end_pos[0] == 0) or (piece.color == 'black' and end_pos[0] == 7)
+            changes[end_pos] = flyweight(type(piece), piece.color, piece.is_king or crowned)
+        elif self.game == 'qwe':
+            moved = flyweight(type(piece), piece.color, True)
+            changes[end_pos] = moved
+            if isinstance(piece, qwe.Pawn):
+                if piece.en_passant_possible(self, start_pos, end_pos):
+                    changes[(start_pos[0], end_pos[1])] = None
+                if end_pos[0] in (0, 7):
+                    promotion = move[2] if len(move) > 2 and move[2] else 'q'
+                    changes[end_pos] = _shared(piece.promote(promotion))
+            last_move = qwe.Move(changes[end_pos], start_pos, end_pos)
+        else:
+            changes[end_pos] = flyweight(type(piece), piece.color, True)
+
+        key = self.key ^ _side_key
+        en_passant_col = self._en_passant_col()
+        if en_passant_col is not None:
+            key ^= _en_passant_keys[en_passant_col]
+        if (last_move is not None and isinstance(last_move.piece, qwe.Pawn) and
+                abs(start_pos[0] - end_pos[0]) == 2):
+            key ^= _en_passant_keys[end_pos[1]]
+        for (row, col), new_piece in changes.items():
+            square = row * 8 + col
+            old_piece = self.grid[row][col]
+            if old_piece is not None:
+                key ^= old_piece.zobrist[square]
+            if new_piece is not None:
+                key ^= new_piece.zobrist[square]
+
+        child = Snapshot(self.game, _replace(self.grid, changes), turn, last_move, key)
+
+        # В шашках после взятия ход остаётся, если можно бить дальше
+        if self.game == 'shashki' and captured_pos and shashki.Board.can_capture_again(child, end_pos):
+            return Snapshot(self.game, child.grid, self.turn, None, key ^ _side_key)
+        return child
+
+
+def _restore(game, cells, turn, last_move, key):
+    """Восстанавливает снимок после pickle"""
+    pieces = [flyweight(*spec) if spec else None for spec in cells]
+    grid = tuple(tuple(pieces[row * 8:row * 8 + 8]) for row in range(8))
+    if last_move is not None:
+        start_pos, end_pos = last_move
+        last_move = qwe.Move(grid[end_pos[0]][end_pos[1]], start_pos, end_pos)
+    return Snapshot(game, grid, turn, last_move, key)
+
+
+def move_to_str(move):
+    """Ход в записи консольных игр: 'e2 e4' или 'e7 e8 q'"""
+    parts = [f"{chr(pos[1] + ord('a'))}{8 - pos[0]}" for pos in move[:2]]
+    if len(move) > 2 and move[2]:
+        parts.append(move[2])
+    return ' '.join(parts)
+
+
+def parse_move(text):
+    """Разбирает ход вида 'e2 e4' или 'e7 e8 q' в координаты"""
+    tokens = text.split()
+    move = tuple((8 - int(token[1]), ord(token[0].lower()) - ord('a')) for token in tokens[:2])
+    if len(tokens) > 2:
+        move += (tokens[2].lower(),)
+    return move
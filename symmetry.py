@@ -0,0 +1,113 @@
+from snapshot import Snapshot, flyweight, move_to_str, opponent, parse_move, piece_state
+
+
+class Transform:
+    """Симметрия доски: отражение слева направо и/или переворот с заменой цветов.
+
+    Каждое преобразование обратно самому себе, поэтому один и тот же
+    объект переводит позицию и ходы в каноническую форму и обратно.
+    """
+
+    def __init__(self, name, mirror, flip):
+        self.name = name
+        self.mirror = mirror  # Колонка c -> 7 - c
+        self.flip = flip  # Ряд r -> 7 - r, белые <-> черные
+
+    def __repr__(self):
+        return f"Transform({self.name!r})"
+
+    def square(self, pos):
+        row, col = pos
+        return (7 - row if self.flip else row, 7 - col if self.mirror else col)
+
+    def move(self, move):
+        """Преобразует ход-кортеж"""
+        return (self.square(move[0]), self.square(move[1])) + tuple(move[2:])
+
+    def move_str(self, text):
+        """Преобразует ход в записи консольных игр"""
+        return move_to_str(self.move(parse_move(text)))
+
+    def apply(self, position):
+        """Преобразованный снимок"""
+        if not self.mirror and not self.flip:
+            return position
+        rows = []
+        for row in range(8):
+            pieces = []
+            for col in range(8):
+                source_row, source_col = self.square((row, col))
+                piece = position.grid[source_row][source_col]
+                if piece is not None and self.flip:
+                    piece = flyweight(type(piece), opponent(piece.color), piece_state(piece))
+                pieces.append(piece)
+            rows.append(tuple(pieces))
+        turn = opponent(position.turn) if self.flip else position.turn
+        return Snapshot(position.game, tuple(rows), turn)
+
+
+IDENTITY = Transform('identity', False, False)
+MIRROR = Transform('mirror', True, False)
+FLIP = Transform('flip', False, True)
+FLIP_MIRROR = Transform('flip_mirror', True, True)
+
+
+def symmetries(position):
+    """Преобразования, сохраняющие правила для данной позиции.
+
+    Отражение слева направо допустимо всегда. Переворот с заменой цветов
+    в hex допустим всегда, а в шашках только без дамок: по
+    Checker.can_move дамка любого цвета ходит без взятия только вниз.
+    Для qwe преобразования не определены (взятие на проходе зависит от
+    последнего хода).
+    """
+    if position.game == 'qwe':
+        return [IDENTITY]
+    if position.game == 'shashki' and any(piece.is_king for _, piece in position.pieces()):
+        return [IDENTITY, MIRROR]
+    return [IDENTITY, MIRROR, FLIP, FLIP_MIRROR]
+
+
+def _as_snapshot(position, turn):
+    if isinstance(position, Snapshot):
+        return position
+    return Snapshot.from_board(position, turn)
+
+
+def canonical(position, turn='white'):
+    """Каноническая форма позиции: (снимок, преобразование).
+
+    Выбирается образ с наименьшим ключом Зобриста. ``position`` -
+    Snapshot или доска shashki.Board / hex.Board (тогда нужен ``turn``).
+    """
+    position = _as_snapshot(position, turn)
+    best, best_transform = position, IDENTITY
+    for transform in symmetries(position)[1:]:
+        image = transform.apply(position)
+        if image.key < best.key:
+            best, best_transform = image, transform
+    return best, best_transform
+
+
+def canonical_key(position, turn='white'):
+    """Ключ, одинаковый для всех симметричных позиций"""
+    return canonical(position, turn)[0].key
+
+
+def canonicalize(position, moves=(), turn='white'):
+    """Позиция и список ходов в канонической ориентации.
+
+    Возвращает (снимок, ходы, преобразование); ходы - кортежи или строки,
+    тип сохраняется. Обратный перевод - restore().
+    """
+    image, transform = canonical(position, turn)
+    return image, [_map_move(transform, move) for move in moves], transform
+
+
+def restore(position, moves, transform):
+    """Переводит каноническую позицию и ходы обратно в исходную ориентацию"""
+    return transform.apply(position), [_map_move(transform, move) for move in moves]
+
+
+def _map_move(transform, move):
+    return transform.move_str(move) if isinstance(move, str) else transform.move(move)
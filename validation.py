@@ -0,0 +1,245 @@
+import copy
+import random
+from multiprocessing import Pool
+
+import shashki
+from factory import new_board
+from snapshot import Snapshot, move_to_str
+
+
+# Коды вердиктов для каждого хода
+MOVE_OK = 0
+BAD_FORMAT = 1  # Неверное число полей или фигура превращения
+BAD_SQUARE = 2  # Координаты вне доски
+NO_PIECE = 3  # На начальной клетке нет фигуры
+WRONG_TURN = 4  # Фигура не того цвета
+ILLEGAL_MOVE = 5  # Фигура так не ходит
+NOT_REPLAYED = 6  # Ход после ошибки не проверялся
+
+VERDICT_NAMES = {
+    MOVE_OK: 'ok',
+    BAD_FORMAT: 'bad format',
+    BAD_SQUARE: 'bad square',
+    NO_PIECE: 'no piece',
+    WRONG_TURN: 'wrong turn',
+    ILLEGAL_MOVE: 'illegal move',
+    NOT_REPLAYED: 'not replayed',
+}
+
+
+class InvalidMoveError(ValueError):
+    """Ход партии не прошёл проверку"""
+
+    def __init__(self, index, move, code):
+        # Все аргументы попадают в args, поэтому исключение переживает pickle
+        super().__init__(index, move, code)
+        self.index = index
+        self.move = move
+        self.code = code
+
+    def __str__(self):
+        return f"Ход №{self.index + 1} {self.move!r}: {VERDICT_NAMES[self.code]}"
+
+
+def _parse(board, token):
+    """Тихий разбор координаты: None вместо исключения"""
+    try:
+        return board.parse_position(token)
+    except ValueError:
+        return None
+
+
+def _blocked(board, player, start_pos, end_pos):
+    """Ход на месте или на свою фигуру; правила фигур такие ходы не отсекают"""
+    if start_pos == end_pos:
+        return True
+    target = board.grid[end_pos[0]][end_pos[1]]
+    return target is not None and target.color == player
+
+
+def _check_qwe(board, player, tokens):
+    if len(tokens) not in {2, 3}:
+        return BAD_FORMAT, player
+    promotion = tokens[2].lower() if len(tokens) == 3 else None
+    if promotion is not None and promotion not in ['q', 'r', 'b', 'n']:
+        return BAD_FORMAT, player
+
+    start_pos = _parse(board, tokens[0])
+    end_pos = _parse(board, tokens[1])
+    if not start_pos or not end_pos:
+        return BAD_SQUARE, player
+
+    piece = board.get_piece(start_pos)
+    if not piece:
+        return NO_PIECE, player
+    if piece.color != player:
+        return WRONG_TURN, player
+    if _blocked(board, player, start_pos, end_pos) or not piece.can_move(board, start_pos, end_pos):
+        return ILLEGAL_MOVE, player
+
+    board.move_piece(start_pos, end_pos, promotion)
+    return MOVE_OK, 'black' if player == 'white' else 'white'
+
+
+def _check_hex(board, player, tokens):
+    if len(tokens) != 2:
+        return BAD_FORMAT, player
+
+    start_pos = _parse(board, tokens[0])
+    end_pos = _parse(board, tokens[1])
+    if not start_pos or not end_pos:
+        return BAD_SQUARE, player
+
+    piece = board.grid[start_pos[0]][start_pos[1]]
+    if not piece:
+        return NO_PIECE, player
+    if piece.color != player:
+        return WRONG_TURN, player
+    if _blocked(board, player, start_pos, end_pos) or not piece.can_move(board, start_pos, end_pos):
+        return ILLEGAL_MOVE, player
+
+    board.make_move(start_pos, end_pos)
+    return MOVE_OK, 'black' if player == 'white' else 'white'
+
+
+def _check_shashki(board, player, tokens):
+    if len(tokens) != 2:
+        return BAD_FORMAT, player
+
+    start_pos = _parse(board, tokens[0])
+    end_pos = _parse(board, tokens[1])
+    if not start_pos or not end_pos:
+        return BAD_SQUARE, player
+
+    piece = board.get_piece(start_pos)
+    if not piece or not isinstance(piece, shashki.Checker):
+        return NO_PIECE, player
+    if piece.color != player:
+        return WRONG_TURN, player
+    if _blocked(board, player, start_pos, end_pos) or not piece.can_move(board, start_pos, end_pos):
+        return ILLEGAL_MOVE, player
+
+    captured_pos, _ = board.make_move(start_pos, end_pos)
+    # После взятия ход остаётся за тем же игроком, если можно бить дальше
+    if captured_pos and board.can_capture_again(end_pos):
+        return MOVE_OK, player
+    return MOVE_OK, 'black' if player == 'white' else 'white'
+
+
+CHECKERS = {
+    'qwe': _check_qwe,
+    'hex': _check_hex,
+    'shashki': _check_shashki,
+}
+
+
+def replay_game(game, start, moves, first_player='white', strict=False):
+    """Проверяет ходы одной партии без вывода в консоль.
+
+    ``start`` - None для начальной расстановки или доска, с которой
+    начинается партия (она не изменяется). Ходы задаются строками
+    вида 'e2 e4' (для qwe можно 'e7 e8 q') или последовательностями полей.
+    Возвращает bytes с кодом вердикта на каждый ход; после первой ошибки
+    остальные ходы помечаются NOT_REPLAYED. При ``strict`` вместо этого
+    выбрасывается InvalidMoveError.
+    """
+    check = CHECKERS[game]
+    board = new_board(game) if start is None else copy.deepcopy(start)
+    player = first_player
+    verdicts = bytearray(len(moves))
+
+    for index, move in enumerate(moves):
+        tokens = move.split() if isinstance(move, str) else list(move)
+        code, player = check(board, player, tokens)
+        if code != MOVE_OK:
+            if strict:
+                raise InvalidMoveError(index, move, code)
+            verdicts[index] = code
+            verdicts[index + 1:] = bytes([NOT_REPLAYED]) * (len(moves) - index - 1)
+            break
+
+    return bytes(verdicts)
+
+
+def _replay_entry(args):
+    game, entry, pooled = args
+    if pooled:
+        # В пуле strict не действует: вердикты и так сообщают об ошибке
+        entry = entry[:3]
+    return replay_game(game, *entry)
+
+
+def validate_games(games, game='qwe', processes=1, chunksize=64):
+    """Проверяет набор партий, каждая задаётся как (start, moves[, first_player[, strict]]).
+
+    Возвращает список bytes-вердиктов в порядке партий. При ``processes``
+    больше 1 партии распределяются по пулу процессов, и ``strict``
+    игнорируется.
+    """
+    if game not in CHECKERS:
+        raise ValueError(f"Неизвестная игра: {game}")
+
+    jobs = ((game, entry, processes != 1) for entry in games)
+    if processes == 1:
+        return [_replay_entry(job) for job in jobs]
+
+    with Pool(processes) as pool:
+        return list(pool.imap(_replay_entry, jobs, chunksize))
+
+
+def is_valid(verdicts):
+    """True, если все ходы партии корректны"""
+    return not any(verdicts)
+
+
+def _replayed_board(game, moves):
+    """Доска после ходов, уже прошедших проверку"""
+    board = new_board(game)
+    player = 'white'
+    for move in moves:
+        _, player = CHECKERS[game](board, player, move.split())
+    return board
+
+
+def cross_check(game='qwe', games=10, max_moves=60, seed=None):
+    """Сверяет проверку ходов со Snapshot.moves() на случайных партиях.
+
+    В каждой позиции все ходы из moves() должны проходить проверку, а
+    остальные пары клеток фигур стороны на ходу - нет. Возвращает список
+    расхождений (ходы партии, спорный ход, вердикт); пустой - всё сходится.
+    """
+    rng = random.Random(seed)
+    check = CHECKERS[game]
+    mismatches = []
+    for _ in range(games):
+        position = Snapshot.initial(game)
+        board = new_board(game)
+        played = []
+        for _ in range(max_moves):
+            legal = position.moves()
+            if position.winner(legal) is not None:
+                break
+            # Ход с превращением проверяется без буквы (по умолчанию ферзь)
+            expected = {move[:2] for move in legal}
+            for start_pos, _piece in position.pieces(position.turn):
+                for row in range(8):
+                    for col in range(8):
+                        move = (start_pos, (row, col))
+                        # Принятый ход меняет доску, поэтому проверяется на копии
+                        trial = copy.deepcopy(board) if move in expected else board
+                        verdict, _ = check(trial, position.turn, move_to_str(move).split())
+                        if (verdict == MOVE_OK) != (move in expected):
+                            mismatches.append((list(played), move_to_str(move), verdict))
+                            if trial is board:
+                                board = _replayed_board(game, played)
+            move = rng.choice(legal)
+            check(board, position.turn, move_to_str(move).split())
+            played.append(move_to_str(move))
+            position = position.play(move)
+    return mismatches
+
+
+if __name__ == "__main__":
+    for name in CHECKERS:
+        problems = cross_check(name, games=2, max_moves=20, seed=1)
+        print(name, 'ok' if not problems else problems[:5])